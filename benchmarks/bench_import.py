@@ -0,0 +1,85 @@
+# Startup benchmark: imports each curation module in a fresh interpreter and prints the time the
+# import takes, the slowest modules it pulls in (from python -X importtime), and any module it
+# should not load: Streamlit anywhere, and pandas for the package and the command line, which
+# import the engine on first use only. Exits with status 1 when such a module is loaded.
+#
+#   python benchmarks/bench_import.py
+#   python benchmarks/bench_import.py --repeat 10 --top 5
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module to import -> modules it must not load
+TARGETS = {
+    'curation': ['streamlit', 'pandas'],
+    'curation.cli': ['streamlit', 'pandas'],
+    'curation.engine': ['streamlit'],
+    'curation.stream': ['streamlit'],
+}
+
+# Run in a child process: import the module and print the seconds taken, then the forbidden
+# modules it loaded
+CHILD = '''
+import sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(' '.join(name for name in {forbidden!r} if name in sys.modules))
+'''
+
+
+def run(module, forbidden, importtime=False):
+    code = CHILD.format(root=ROOT, module=module, forbidden=forbidden)
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    result = subprocess.run(command, check=True, capture_output=True, text=True)
+    lines = result.stdout.splitlines()
+    return float(lines[-2]), lines[-1].split(), result.stderr
+
+
+# Imports of an -X importtime report, as (cumulative seconds, module name as indented in the report)
+def report_imports(report):
+    imports = []
+    for line in report.splitlines():
+        if line.startswith('import time:') and 'cumulative' not in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            imports.append((int(cumulative) / 1e6, name.rstrip()))
+    return imports
+
+
+# Slowest imports of a report, leaving out the imported module itself and the modules every
+# interpreter imports at startup
+def slowest_imports(report, module, startup, top):
+    imports = [(seconds, name) for seconds, name in report_imports(report)
+               if name.strip() != module and name.strip() not in startup]
+    return sorted(imports, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the import time of the curation modules.')
+    parser.add_argument('--repeat', type=int, default=5, help='imports of each module timed (median reported)')
+    parser.add_argument('--top', type=int, default=8, help='slowest imports listed for each module')
+    args = parser.parse_args()
+
+    startup_report = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'pass'],
+                                    check=True, capture_output=True, text=True).stderr
+    startup = {name.strip() for _, name in report_imports(startup_report)}
+
+    failures = 0
+    for module, forbidden in TARGETS.items():
+        seconds = statistics.median(run(module, forbidden)[0] for _ in range(args.repeat))
+        _, loaded, report = run(module, forbidden, importtime=True)
+        status = f"loads {', '.join(loaded)}" if loaded else 'ok'
+        print(f'{module:<18} {seconds * 1000:8.1f} ms  {status}')
+        for cumulative, name in slowest_imports(report, module, startup, args.top):
+            print(f'    {cumulative * 1000:8.1f} ms  {name}')
+        failures += bool(loaded)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
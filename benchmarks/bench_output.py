@@ -0,0 +1,74 @@
+# Benchmark of the output formats: writes the same curated sheets as an Excel workbook (xlsxwriter,
+# with and without constant_memory) and as zips of CSV and Parquet files, and prints the write time
+# and file size of each. Zip archives are checked to hold every sheet with its columns in order.
+#
+#   python benchmarks/bench_output.py --rows 20000 --repeat 3
+#   python benchmarks/bench_output.py path/to/source.xlsx
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from curation.engine import curate_sheets  # noqa: E402
+from curation.output import write_output  # noqa: E402
+from synthetic import write_source  # noqa: E402
+
+# Output format, and options of write_output, of every run
+RUNS = {
+    'xlsx': ('xlsx', {}),
+    'xlsx constant_memory': ('xlsx', {'constant_memory': True}),
+    'csv zip': ('csv', {}),
+    'parquet zip': ('parquet', {}),
+}
+
+
+def write_time(sheets, output_format, options, repeat):
+    best = None
+    for _ in range(repeat):
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        write_output(sheets, buffer, output_format, **options)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, buffer
+
+
+def check_zip(sheets, buffer, output_format):
+    with zipfile.ZipFile(buffer) as archive:
+        assert archive.namelist() == [f'{sheet_name}.{output_format}' for sheet_name in sheets]
+        for sheet_name, df in sheets.items():
+            with archive.open(f'{sheet_name}.{output_format}') as entry:
+                columns = pd.read_csv(entry, nrows=0).columns if output_format == 'csv' else pq.read_schema(entry).names
+            assert list(columns) == list(df.columns), sheet_name
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark writing the curated sheets in each output format.')
+    parser.add_argument('source', nargs='?', help='source .xlsx (default: a synthetic source)')
+    parser.add_argument('--rows', type=int, default=20000, help='rows of the synthetic source')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = args.source or write_source(os.path.join(workdir, 'source.xlsx'), rows=args.rows)
+        sheets = curate_sheets(source)
+    print(f'{sum(len(df) for df in sheets.values())} curated rows in {len(sheets)} sheets')
+
+    xlsx_seconds = None
+    for name, (output_format, options) in RUNS.items():
+        seconds, buffer = write_time(sheets, output_format, options, args.repeat)
+        if output_format != 'xlsx':
+            check_zip(sheets, buffer, output_format)
+        xlsx_seconds = xlsx_seconds or seconds
+        print(f'{name:>22}: {seconds:7.3f}s ({xlsx_seconds / seconds:5.1f}x)  {len(buffer.getvalue()) / 1e6:7.2f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# Benchmark: full parse of the source sheet (every column, inferred types) against the
+# column-projected read_source. Reports parse time and DataFrame memory for both.
+#
+#   python benchmarks/bench_reader.py [source.xlsx]
+#
+# Without a source file, a wide workbook is generated with the columns the curation reads
+# plus 300 columns it doesn't, roughly the shape of a full INFRA3 export.
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from curation.reader import SOURCE_COLUMNS, read_source  # noqa: E402
+
+
+def make_wide_source(path, rows=2000, unused_columns=300):
+    rng = np.random.default_rng(0)
+    data = {column: rng.choice(['Some text', 'Other text', None], size=rows) for column in sorted(SOURCE_COLUMNS)}
+    data["Transaction Upload ID"] = [f'T{i:06d}' for i in range(rows)]
+    for i in range(unused_columns):
+        data[f'Unused column {i}'] = rng.choice([1.5, 2.0, None], size=rows)
+    pd.DataFrame(data).to_excel(path, index=False)
+
+
+def timed(read):
+    start = time.perf_counter()
+    df = read()
+    return df, time.perf_counter() - start, df.memory_usage(deep=True).sum() / 1e6
+
+
+def main():
+    if len(sys.argv) > 1:
+        source_file = sys.argv[1]
+    else:
+        source_file = os.path.join(tempfile.mkdtemp(), 'wide_source.xlsx')
+        make_wide_source(source_file)
+
+    full_df, full_seconds, full_mb = timed(lambda: pd.ExcelFile(source_file).parse(0))
+    projected_df, projected_seconds, projected_mb = timed(lambda: read_source(source_file))
+
+    print(f'{"":<12} {"columns":>8} {"parse (s)":>10} {"memory (MB)":>12}')
+    print(f'{"full":<12} {full_df.shape[1]:>8} {full_seconds:>10.2f} {full_mb:>12.1f}')
+    print(f'{"projected":<12} {projected_df.shape[1]:>8} {projected_seconds:>10.2f} {projected_mb:>12.1f}')
+    print(f'saved {full_seconds - projected_seconds:.2f}s and {full_mb - projected_mb:.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# Benchmark: 'Tranche Role Type' assignment with the old per-role boolean scan of tranches_df
+# against the hash lookup in assign_tranche_role_types.
+#
+#   python benchmarks/bench_role_types.py [role rows] [tranche rows]
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from curation.engine import assign_tranche_role_types  # noqa: E402
+
+
+# The old loop: scan every tranche for each role and write back with .at
+def per_row(tranche_roles_any_df, tranches_df):
+    for i, row in tranche_roles_any_df.iterrows():
+        tranche_upload_id = row['Tranche Upload ID']
+        tranche_info = tranches_df[tranches_df['Tranche Upload ID'] == tranche_upload_id]
+        if not tranche_info.empty:
+            if tranche_info.iloc[0]['Tranche Primary Type'] == 'Equity':
+                tranche_roles_any_df.at[i, 'Tranche Role Type'] = 'Sponsor'
+            elif tranche_info.iloc[0]['Tranche Secondary Type'] == 'Bond':
+                tranche_roles_any_df.at[i, 'Tranche Role Type'] = 'Bond Arranger'
+            elif tranche_info.iloc[0]['Tranche Secondary Type'] == 'Loan':
+                tranche_roles_any_df.at[i, 'Tranche Role Type'] = 'Debt Provider'
+            elif (tranche_info.iloc[0]['Tranche Primary Type'] == 'Debt' and
+                  tranche_info.iloc[0]['Tranche Secondary Type'] == 'Non-Commercial Instrument'):
+                tranche_roles_any_df.at[i, 'Tranche Role Type'] = 'Debt Provider'
+    return tranche_roles_any_df
+
+
+def make_frames(role_rows, tranche_rows, rng):
+    suffixes = np.array(['-L1', '-L2', '-L4', '-CM1', '-CM5', '-E'], dtype=object)
+    transaction_ids = np.array([f'T{i:06d}' for i in range(tranche_rows // len(suffixes) + 1)], dtype=object)
+    tranche_ids = pd.unique((transaction_ids[:, None] + suffixes).ravel())[:tranche_rows]
+    tranches_df = pd.DataFrame({'Tranche Upload ID': tranche_ids})
+    tranches_df['Tranche Primary Type'] = np.where(tranches_df['Tranche Upload ID'].str.endswith('-E'), 'Equity', 'Debt')
+    tranches_df['Tranche Secondary Type'] = np.select(
+        [tranches_df['Tranche Upload ID'].str.contains('-L'), tranches_df['Tranche Upload ID'].str.contains('-CM')],
+        ['Loan', 'Bond'], default='Equity')
+    # A few roles point at tranches that were filtered out of the Tranches sheet
+    role_ids = np.concatenate([tranche_ids, [f'T999999-L{i}' for i in range(1, 4)]])
+    tranche_roles_any_df = pd.DataFrame({
+        'Tranche Upload ID': rng.choice(role_ids, size=role_rows),
+        'Tranche Role Type': '',
+        'Company': 'Bank',
+    })
+    return tranche_roles_any_df, tranches_df
+
+
+def main():
+    role_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    tranche_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    tranche_roles_any_df, tranches_df = make_frames(role_rows, tranche_rows, np.random.default_rng(0))
+
+    expected = per_row(tranche_roles_any_df.copy(), tranches_df)
+    actual = assign_tranche_role_types(tranche_roles_any_df.copy(), tranches_df)
+    pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+
+    slow = min(timeit.repeat(lambda: per_row(tranche_roles_any_df.copy(), tranches_df), number=1, repeat=1))
+    fast = min(timeit.repeat(lambda: assign_tranche_role_types(tranche_roles_any_df.copy(), tranches_df), number=1, repeat=5))
+    print(f'{role_rows} role rows, {len(tranches_df)} tranches')
+    print(f'per-row scan: {slow:.3f}s  hash lookup: {fast:.4f}s  speed-up: {slow / fast:.0f}x')
+
+
+if __name__ == '__main__':
+    main()
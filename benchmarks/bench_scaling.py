@@ -0,0 +1,159 @@
+# Scaling benchmark: runs every curation stage and the end-to-end create_destination_file on
+# synthetic sources of increasing size and records the timings as JSON.
+#
+#   python benchmarks/bench_scaling.py --sizes 1000 10000 100000 --output results.json
+#   python benchmarks/bench_scaling.py --baseline results.json --tolerance 0.25 --repeat 5
+#
+# Each stage is timed --repeat times and the best time is recorded, so that one slow run doesn't
+# count. With --baseline, any stage that got slower than the baseline by more than the tolerance
+# (and by more than 50ms) is reported and the script exits with status 1.
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from curation import engine, names  # noqa: E402
+from curation.output import write_excel  # noqa: E402
+from curation.reader import read_source  # noqa: E402
+from synthetic import write_source  # noqa: E402
+
+# Slowdowns smaller than this are treated as noise when comparing with a baseline
+MIN_REGRESSION_SECONDS = 0.05
+
+
+# Best time of `repeat` runs of func(*args). Every run gets its own copy of the DataFrame arguments
+# (some stages change their input) and starts with empty company name caches.
+def timed(results, stage, repeat, func, *args):
+    best = None
+    for _ in range(repeat):
+        run_args = [arg.copy() if isinstance(arg, pd.DataFrame) else arg for arg in args]
+        names.NAME_CACHES.clear()
+        start = time.perf_counter()
+        result = func(*run_args)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    rows = len(result) if isinstance(result, pd.DataFrame) else None
+    results[stage] = {'seconds': round(best, 4), 'rows_out': rows}
+    return result
+
+
+# Time each stage on the parsed source, in the order of engine.CURATION_STAGES, each given the
+# output of the stages it follows there
+def bench_stages(transaction_df, repeat):
+    results = {}
+    transaction_sheet_df = timed(results, 'process_transaction_sheet', repeat, engine.process_transaction_sheet,
+                                 transaction_df)
+    transaction_sheet_df = timed(results, 'clean_transaction_name', repeat, engine.clean_transaction_name,
+                                 transaction_sheet_df)
+    timed(results, 'replace_and_with_ampersand', repeat, engine.replace_and_with_ampersand, transaction_sheet_df)
+    timed(results, 'process_events_sheet', repeat, engine.process_events_sheet, transaction_df)
+    bidders_any_df = timed(results, 'process_bidders_any_sheet', repeat, engine.process_bidders_any_sheet, transaction_df)
+    timed(results, 'clean_bidder_names', repeat, engine.clean_bidder_names, bidders_any_df)
+    tranches_df = timed(results, 'process_tranches_sheet', repeat, engine.process_tranches_sheet, transaction_df)
+    tranches_df = timed(results, 'populate_additional_tranches', repeat, engine.populate_additional_tranches,
+                        transaction_df, tranches_df)
+    tranches_df = timed(results, 'assign_tranche_types', repeat, engine.assign_tranche_types, tranches_df)
+    tranche_roles_any_df = timed(results, 'populate_tranche_roles_any', repeat, engine.populate_tranche_roles_any,
+                                 transaction_df, None)
+    tranche_roles_any_df = timed(results, 'assign_tranche_role_types', repeat, engine.assign_tranche_role_types,
+                                 tranche_roles_any_df, tranches_df)
+    timed(results, 'clean_company_names', repeat, engine.clean_company_names, tranche_roles_any_df)
+    return results
+
+
+def bench_size(rows, workdir, options, repeat=1):
+    source_file = write_source(os.path.join(workdir, f'source_{rows}.xlsx'), rows=rows, **options)
+
+    results = {'rows': rows, 'source_bytes': os.path.getsize(source_file), 'stages': {}}
+    stages = results['stages']
+    transaction_df = timed(stages, 'read_source', repeat, read_source, source_file)
+    stages.update(bench_stages(transaction_df, repeat))
+    sheets = timed(stages, 'curate_sheets', repeat, engine.curate_sheets, source_file)
+    timed(stages, 'write_excel', repeat, write_excel, sheets, os.path.join(workdir, f'curated_{rows}.xlsx'))
+    timed(stages, 'create_destination_file', repeat, engine.create_destination_file,
+          source_file, os.path.join(workdir, f'curated_{rows}_end_to_end.xlsx'))
+    results['sheet_rows'] = {name: len(df) for name, df in sheets.items()}
+    end_to_end = stages['create_destination_file']['seconds']
+    results['rows_per_second'] = round(rows / end_to_end, 1) if end_to_end else None
+    return results
+
+
+# Stages that got slower than in the baseline run, as (rows, stage, baseline seconds, seconds)
+def find_regressions(report, baseline, tolerance):
+    baseline_sizes = {run['rows']: run for run in baseline['runs']}
+    regressions = []
+    for run in report['runs']:
+        previous = baseline_sizes.get(run['rows'])
+        if previous is None:
+            continue
+        for stage, timing in run['stages'].items():
+            if stage not in previous['stages']:
+                continue
+            before = previous['stages'][stage]['seconds']
+            after = timing['seconds']
+            if after > before * (1 + tolerance) and after - before > MIN_REGRESSION_SECONDS:
+                regressions.append((run['rows'], stage, before, after))
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Benchmark the curation stages on synthetic sources.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='source rows per run')
+    parser.add_argument('--loan-tranches', type=int, default=20)
+    parser.add_argument('--cap-market-tranches', type=int, default=20)
+    parser.add_argument('--lenders', type=int, default=6)
+    parser.add_argument('--sectors', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_scaling.json', help='where to write the JSON results')
+    parser.add_argument('--baseline', help='earlier JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against the baseline')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each stage; the best time is recorded')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    options = {
+        'loan_tranches': args.loan_tranches, 'cap_market_tranches': args.cap_market_tranches,
+        'lenders': args.lenders, 'sectors': args.sectors, 'seed': args.seed}
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'options': options,
+        'repeat': args.repeat,
+        'runs': [],
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.sizes:
+            run = bench_size(rows, workdir, options, args.repeat)
+            report['runs'].append(run)
+            print(f'{rows:>8} rows: ' + ', '.join(
+                f'{stage} {timing["seconds"]:.2f}s' for stage, timing in run['stages'].items()))
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f'Results written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = find_regressions(report, json.load(file), args.tolerance)
+        for rows, stage, before, after in regressions:
+            print(f'REGRESSION {rows} rows, {stage}: {before:.3f}s -> {after:.3f}s')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
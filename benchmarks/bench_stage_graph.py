@@ -0,0 +1,62 @@
+# Benchmark of the curation stage graph: runs the stages one after another, concurrently in threads
+# only, and concurrently in threads and processes (see curation.graph), on the same parsed source,
+# and checks that every run gives the same sheets.
+#
+#   python benchmarks/bench_stage_graph.py --rows 20000 --workers 4 --repeat 3
+#   python benchmarks/bench_stage_graph.py path/to/source.xlsx --workers 4
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from curation.engine import CURATION_STAGES, curate_transactions  # noqa: E402
+from curation.reader import read_source  # noqa: E402
+from curation.timing import timings_frame  # noqa: E402
+from synthetic import write_source  # noqa: E402
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sequential vs concurrent curation stages.')
+    parser.add_argument('source', nargs='?', help='source .xlsx (default: a synthetic source)')
+    parser.add_argument('--rows', type=int, default=20000, help='rows of the synthetic source')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = args.source or write_source(os.path.join(workdir, 'source.xlsx'), rows=args.rows)
+        transaction_df = read_source(source)
+    print(f'{len(transaction_df)} source rows, {args.workers} workers, {os.cpu_count()} CPUs')
+
+    timings = []
+    sequential, expected = best_time(lambda: curate_transactions(transaction_df, timings), args.repeat)
+    print(timings_frame(timings[:len(CURATION_STAGES)]).to_string(index=False))
+
+    runs = {
+        'threads': lambda: curate_transactions(transaction_df, workers=args.workers, use_processes=False),
+        'threads + processes': lambda: curate_transactions(transaction_df, workers=args.workers),
+    }
+    print(f'\n{"sequential":>20}: {sequential:.3f}s')
+    for name, run in runs.items():
+        seconds, sheets = best_time(run, args.repeat)
+        for sheet_name, df in expected.items():
+            pd.testing.assert_frame_equal(sheets[sheet_name], df)
+        print(f'{name:>20}: {seconds:.3f}s ({sequential / seconds:.2f}x), same sheets')
+
+
+if __name__ == '__main__':
+    main()
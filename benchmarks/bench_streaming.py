@@ -0,0 +1,58 @@
+# Benchmark of streaming mode (curation.stream): curates the same source in full and chunk by
+# chunk, each in a fresh process, and prints the wall time and peak memory (max RSS) of each run.
+#
+#   python benchmarks/bench_streaming.py --rows 20000 --chunk-rows 2000 5000
+#   python benchmarks/bench_streaming.py path/to/source.xlsx --format csv
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from synthetic import write_source  # noqa: E402
+
+# Run in a child process: curate the source (in chunks of N rows unless N is 0) and print the
+# seconds taken and the peak RSS in MB
+CHILD = '''
+import resource, sys, time
+sys.path.insert(0, {root!r})
+from curation.engine import create_destination_file
+from curation.stream import stream_destination
+start = time.perf_counter()
+if {chunk_rows}:
+    stream_destination({source!r}, {destination!r}, {output_format!r}, {chunk_rows})
+else:
+    create_destination_file({source!r}, {destination!r}, constant_memory=True, output_format={output_format!r})
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+'''
+
+
+def run(source, destination, output_format, chunk_rows):
+    code = CHILD.format(root=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), source=source,
+                        destination=destination, output_format=output_format, chunk_rows=chunk_rows)
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    seconds, peak_mb = map(float, output.split()[-2:])
+    return seconds, peak_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark peak memory of full vs streamed curation.')
+    parser.add_argument('source', nargs='?', help='source .xlsx (default: a synthetic source)')
+    parser.add_argument('--rows', type=int, default=20000, help='rows of the synthetic source')
+    parser.add_argument('--chunk-rows', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--format', choices=['xlsx', 'csv'], default='xlsx', dest='output_format')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = args.source or write_source(os.path.join(workdir, 'source.xlsx'), rows=args.rows)
+        destination = os.path.join(workdir, f'curated.{args.output_format}')
+        print(f'{source} ({os.path.getsize(source) / 1e6:.1f} MB), {args.output_format} output')
+        for chunk_rows in [0] + args.chunk_rows:
+            seconds, peak_mb = run(source, destination, args.output_format, chunk_rows)
+            label = f'chunks of {chunk_rows}' if chunk_rows else 'full (constant_memory)'
+            print(f'{label:>24}: {seconds:7.2f}s  peak {peak_mb:7.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
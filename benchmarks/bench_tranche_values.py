@@ -0,0 +1,107 @@
+# Benchmark and equivalence check: the Tranches value math and type assignment with the old
+# row-by-row applies against the column-wise process_tranches_sheet and assign_tranche_types.
+# The outputs must be identical, dtypes included, on a synthetic source and on edge cases: value
+# text such as '1,250.5', '' or 'inf', zero transaction totals and a source without rows. The
+# script stops with an AssertionError when they differ.
+#
+#   python benchmarks/bench_tranche_values.py [source rows]
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from curation.engine import (COMPUTED_TRANCHE_COLUMNS, TRANCHE_KEY_COLUMNS, TRANCHE_TERTIARY_TYPE,  # noqa: E402
+                             assign_tranche_types, expand_loan_tranches, populate_additional_tranches,
+                             process_tranches_sheet, safe_float_conversion)
+from synthetic import make_source_frame  # noqa: E402
+
+# Values put in the transaction and tranche value columns of the edge case source
+EDGE_VALUES = ['1,250.5', '', 'inf', '-inf', 'nan', 'abc', ' 12 ', '  7,000  ', '1_000', '-0', '0', '0.1', '1e400',
+               '12345678901234567890', np.nan, 3, 0.0, -0.0, 1e308, 1e-308]
+
+
+# The old process_tranches_sheet: three applies over the rows, each converting with safe_float_conversion
+def per_row_values(transaction_df):
+    tranches_df = expand_loan_tranches(transaction_df)
+    tranches_df["Helper_Tranche Value USD m as % of Helper_Transaction Value USD m"] = tranches_df.apply(
+        lambda row: safe_float_conversion(row["Helper_Tranche Value USD m"]) / safe_float_conversion(row["Helper_Transaction Value USD m"])
+        if safe_float_conversion(row["Helper_Transaction Value USD m"]) != 0 else 0, axis=1, result_type='reduce')
+    tranches_df["Value"] = tranches_df.apply(
+        lambda row: safe_float_conversion(row["Helper_Tranche Value USD m as % of Helper_Transaction Value USD m"]) * safe_float_conversion(row["Helper_Transaction Value LC"])
+        if safe_float_conversion(row["Helper_Tranche Value USD m as % of Helper_Transaction Value USD m"]) and safe_float_conversion(row["Helper_Transaction Value LC"]) else 0,
+        axis=1, result_type='reduce')
+    tranches_df["Tranche ESG Type"] = tranches_df.apply(
+        lambda row: f'{row["Tranche ESG Type"]}, Tranche ESG Type' if "Islamic" in row["Tranche Tertiary Type"] else row["Tranche ESG Type"],
+        axis=1, result_type='reduce')
+    tranches_df["Tranche Tertiary Type"] = tranches_df["Tranche Tertiary Type"].replace(TRANCHE_TERTIARY_TYPE)
+    return tranches_df
+
+
+# The old assign_tranche_types: match the endings of 'Tranche Upload ID' row by row
+def per_row_types(tranches_df):
+    tranches_df['Tranche Primary Type'] = tranches_df['Tranche Upload ID'].apply(
+        lambda x: 'Debt' if any(x.endswith(suffix) for suffix in ['L1', 'L2', 'L3', 'CM1', 'CM2', 'CM3']) else 'Equity')
+    tranches_df['Tranche Secondary Type'] = tranches_df['Tranche Upload ID'].apply(
+        lambda x: 'Loan' if any(x.endswith(suffix) for suffix in ['L1', 'L2', 'L3'])
+        else ('Bond' if any(x.endswith(suffix) for suffix in ['CM1', 'CM2', 'CM3']) else 'Equity'))
+    tranches_df['Tranche Tertiary Type'] = tranches_df.apply(
+        lambda row: 'Commercial Bond' if any(row['Tranche Upload ID'].endswith(suffix) for suffix in ['CM1', 'CM2', 'CM3'])
+        else row['Tranche Tertiary Type'], axis=1, result_type='reduce')
+    return tranches_df.drop(columns=TRANCHE_KEY_COLUMNS)
+
+
+# Same values and dtypes, and the same sign for zeros in the computed columns (assert_frame_equal
+# takes -0.0 for 0.0; the additional tranches hold '' there)
+def assert_same(expected, actual):
+    pd.testing.assert_frame_equal(expected, actual, check_exact=True)
+    for column in COMPUTED_TRANCHE_COLUMNS:
+        if column in expected:
+            signs = [np.signbit(pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)) for df in (expected, actual)]
+            assert np.array_equal(*signs), column
+
+
+def check(name, transaction_df):
+    expected = per_row_values(transaction_df)
+    actual = process_tranches_sheet(transaction_df)
+    assert_same(expected, actual)
+    tranches_df = populate_additional_tranches(transaction_df, actual)
+    assert_same(per_row_types(tranches_df.copy()), assign_tranche_types(tranches_df.copy()))
+    print(f'{name:<14} {len(actual):>7} tranches  identical')
+
+
+# A source whose first loan tranche is filled in on every row, with edge values in the value columns
+def edge_source(source_df):
+    edge_df = source_df.head(len(EDGE_VALUES) * 3).copy()
+    edge_df['Loan Debt Tranche 1 Type'] = edge_df['Loan Debt Tranche 1 Type'].fillna('Islamic Finance')
+    for offset, column in enumerate(['Transaction size USD(m)', 'Transaction size (m)', 'Tranche 1 Volume USD (m)']):
+        edge_df[column] = pd.Series([EDGE_VALUES[(i * (offset + 1) + offset) % len(EDGE_VALUES)] for i in range(len(edge_df))],
+                                    index=edge_df.index, dtype=object)
+    return edge_df
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    source_df = make_source_frame(rows).infer_objects()
+    zero_df = source_df.head(200).copy()
+    zero_df['Transaction size USD(m)'] = 0
+
+    check('synthetic', source_df)
+    check('edge values', edge_source(source_df))
+    check('zero totals', zero_df)
+    check('no rows', source_df.head(0))
+
+    slow = min(timeit.repeat(lambda: per_row_values(source_df), number=1, repeat=1))
+    fast = min(timeit.repeat(lambda: process_tranches_sheet(source_df), number=1, repeat=3))
+    print(f'{rows} source rows')
+    print(f'values  per-row: {slow:.3f}s  column-wise: {fast:.4f}s  speed-up: {slow / fast:.1f}x')
+    tranches_df = populate_additional_tranches(source_df, process_tranches_sheet(source_df))
+    slow = min(timeit.repeat(lambda: per_row_types(tranches_df.copy()), number=1, repeat=1))
+    fast = min(timeit.repeat(lambda: assign_tranche_types(tranches_df.copy()), number=1, repeat=3))
+    print(f'types   per-row: {slow:.3f}s  column-wise: {fast:.4f}s  speed-up: {slow / fast:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+# Synthetic INFRA3-shaped source workbooks for benchmarking. The values are drawn from the
+# real vocabularies in curation.mappings (statuses, countries, sectors, ...) so every stage of
+# the curation has realistic work to do.
+#
+#   python benchmarks/synthetic.py source_10k.xlsx --rows 10000 --loan-tranches 20 --lenders 8
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from curation.mappings import (  # noqa: E402
+    ANY_LEVEL_SECTORS, CONTRACT, REGION_COUNTRY, TRANSACTION_STATUS, TRANSACTION_TYPE)
+
+BANKS = [
+    'BNP Paribas', 'Societe Generale', 'HSBC', 'Mizuho Bank', 'MUFG', 'SMBC', 'ING', 'Natixis',
+    'Credit Agricole CIB', 'Santander', 'BBVA', 'Barclays', 'Lloyds Bank', 'NatWest', 'KfW IPEX-Bank',
+    'Helaba', 'Commerzbank', 'Deutsche Bank', 'Intesa Sanpaolo', 'UniCredit', 'Rabobank', 'ABN AMRO',
+    'Nordea', 'DNB', 'Standard Chartered', 'Citi', 'JP Morgan', 'Bank of America', 'Wells Fargo',
+    'European Investment Bank', 'IFC', 'Asian Development Bank', 'EBRD', 'Export Development Canada']
+SPONSORS = [
+    'Macquarie', 'KKR', 'Meridiam', 'Brookfield', 'Global Infrastructure Partners', 'Allianz Capital Partners',
+    'APG', 'CDPQ', 'Vinci Concessions', 'Acciona', 'Ferrovial', 'John Laing', 'InfraRed Capital Partners']
+ADVISERS = [
+    'Allen & Overy', 'Linklaters', 'Clifford Chance', 'White & Case', 'Norton Rose Fulbright', 'Mott MacDonald',
+    'Arup', 'AECOM', 'KPMG', 'EY', 'PwC', 'Deloitte', 'Rothschild & Co', 'Lazard']
+TAGS = ['', '', '', ' (Funders)', ' (Acquirer)', ' (SPV)', ' (Seller)', ' (Grantor)', ' (Target)', ' (Lenders)']
+LOAN_TYPES = [
+    'Term Loan', 'Term Loan', 'Islamic Financing', 'Export Credit', 'Multilateral', 'Capex Facility',
+    'Government Loan', 'Equity Bridge Loan', 'Standby/Contigency Facility', 'Other']
+EVENT_DATE_COLUMNS = [
+    "Current status date", "Financial close", "Transaction Launch", "RFP returned", "Preferred Proponents",
+    "Expressions of Interest", "RFQ returned", "Shortlisted proponents"]
+
+
+# Pool of comma-separated company lists, e.g. 'HSBC (25%), ING (Agent, 10%)'
+def company_lists(rng, names, max_length, size=500, percentages=True):
+    lists = []
+    for _ in range(size):
+        companies = []
+        for name in rng.choice(names, size=rng.integers(1, max_length + 1), replace=False):
+            if percentages and rng.random() < 0.4:
+                name = f'{name} ({rng.choice(["Agent, ", ""])}{rng.integers(1, 60)}%)'
+            elif rng.random() < 0.1:
+                name = f'{name}  (Lead)'
+            companies.append(name)
+        lists.append(', '.join(companies))
+    return np.array(lists, dtype=object)
+
+
+# Pool of party lists for a Bidders_Any source column, using its delimiter
+def party_lists(rng, names, delimiter, size=300):
+    lists = [
+        f'{delimiter} '.join(f'{name}{rng.choice(TAGS)}' for name in rng.choice(names, size=rng.integers(1, 4), replace=False))
+        for _ in range(size)]
+    return np.array(lists, dtype=object)
+
+
+# Fill a column from a pool of values, leaving a share of the cells blank
+def sparse(rng, pool, rows, fill_rate):
+    values = rng.choice(pool, size=rows).astype(object)
+    values[rng.random(rows) >= fill_rate] = np.nan
+    return values
+
+
+# Build a synthetic INFRA3 export with the given number of rows, tranche column groups,
+# maximum lenders per tranche and maximum sub-sectors per deal. extra_columns adds columns
+# the curation doesn't read, as found in full exports.
+def make_source_frame(rows=1000, loan_tranches=20, cap_market_tranches=20, lenders=6, sectors=3,
+                      extra_columns=0, seed=0):
+    rng = np.random.default_rng(seed)
+    sub_sector_names = list(ANY_LEVEL_SECTORS) + ['Unmapped Sector']
+    sub_sectors = np.array([
+        ', '.join(rng.choice(sub_sector_names, size=rng.integers(1, sectors + 1), replace=False))
+        for _ in range(500)], dtype=object)
+    transaction_sizes = rng.choice([50.0, 120.5, 480.0, 1250.0, 3000.0], size=rows).astype(object)
+    transaction_sizes[rng.random(rows) < 0.05] = np.nan
+
+    data = {
+        "Transaction Upload ID": [f'INFRA3-{i:07d}' for i in range(rows)],
+        "Transaction Name": rng.choice(
+            ['M25 Widening and Maintenance', 'Offshore  Wind Farm', ' Solar PV Portfolio ', 'Port and Rail Hub',
+             'Hospital PPP', 'Fibre Network Refinancing'], size=rows),
+        "Current status": rng.choice(list(TRANSACTION_STATUS) + ['Financial Close', 'Cancelled'], size=rows),
+        "Type": rng.choice(list(TRANSACTION_TYPE) + ['Brownfield'], size=rows),
+        "Transaction Currency": rng.choice(['USD', 'EUR', 'GBP', 'AUD', 'BRL'], size=rows),
+        "Transaction size (m)": transaction_sizes,
+        "Transaction size USD(m)": rng.choice([60.0, 130.0, 500.0, 1400.0, np.nan], size=rows),
+        "Geography": rng.choice(list(REGION_COUNTRY) + ['ATLANTIS'], size=rows),
+        "Sector": rng.choice(['Transport', 'Energy', 'Renewables', 'Social Infrastructure', 'Telecoms'], size=rows),
+        "Sub-Sector": rng.choice(sub_sectors, size=rows),
+        "PPP": rng.choice(['Yes', 'No'], size=rows),
+        "Duration": sparse(rng, np.array([20, 25, 30, 35]), rows, 0.6),
+        "Delivery Model": sparse(rng, np.array(list(CONTRACT)), rows, 0.7),
+        "SPV": sparse(rng, np.array(['Project Co Ltd', 'Holdco SAS', 'Funding Plc']), rows, 0.5),
+        "Tranche ESG Type": sparse(rng, np.array(['Green', 'Sustainability-Linked', 'Social']), rows, 0.2),
+        "Legal Advisors": sparse(rng, party_lists(rng, ADVISERS, ';'), rows, 0.6),
+        "Technical Advisors": sparse(rng, party_lists(rng, ADVISERS, ';'), rows, 0.4),
+        "Financial Advisors": sparse(rng, party_lists(rng, ADVISERS, ';'), rows, 0.5),
+        "Vendors": sparse(rng, party_lists(rng, SPONSORS, ','), rows, 0.2),
+        "Grantors": sparse(rng, np.array(['Department for Transport', 'City of Lyon (Grantor)', 'State of Victoria']), rows, 0.5),
+        "Equity Providers at FC": sparse(rng, company_lists(rng, SPONSORS, 4), rows, 0.4),
+        "Equity at FC USD(m)": sparse(rng, np.array(['100', '1,250.5', '75 (est.)']), rows, 0.5),
+    }
+
+    base_date = np.datetime64('2015-01-01')
+    for column in EVENT_DATE_COLUMNS:
+        dates = pd.Series(base_date + rng.integers(0, 3650, size=rows).astype('timedelta64[D]'))
+        data[column] = dates.where(rng.random(rows) < 0.35)
+
+    # Each deal fills its first few tranche groups, as in real exports
+    loan_counts = rng.geometric(0.45, size=rows) - 1
+    cap_market_counts = rng.geometric(0.75, size=rows) - 1
+
+    lender_lists = company_lists(rng, BANKS, lenders)
+    for i in range(1, loan_tranches + 1):
+        filled = loan_counts >= i
+        data[f'Loan Debt Tranche {i} Type'] = np.where(filled, rng.choice(LOAN_TYPES, size=rows), None)
+        data[f'Tranche {i} Tenor'] = np.where(filled, rng.choice([5, 7, 10, 15, 18, 25], size=rows), np.nan)
+        data[f'Tranche {i} Volume USD (m)'] = np.where(filled, rng.choice([25.0, 80.0, 150.0, 400.0], size=rows), np.nan)
+        data[f'Tranche {i} Lenders'] = np.where(filled, rng.choice(lender_lists, size=rows), None)
+
+    underwriter_lists = company_lists(rng, BANKS, max(1, lenders // 2))
+    for i in range(1, cap_market_tranches + 1):
+        filled = cap_market_counts >= i
+        data[f'Capital Market Debt {i} Volume USD (m)'] = np.where(filled, rng.choice([100.0, 250.0, 600.0], size=rows), np.nan)
+        data[f'Capital Market Debt {i} Underwriters'] = np.where(filled, rng.choice(underwriter_lists, size=rows), None)
+        data[f'Capital Market Debt 2{i} Underwriters'] = np.where(
+            rng.random(rows) < 0.02 / i, rng.choice(underwriter_lists, size=rows), None)
+
+    for i in range(extra_columns):
+        data[f'Unused column {i}'] = rng.choice([1.5, 2.0, np.nan], size=rows)
+
+    return pd.DataFrame(data)
+
+
+# Write a synthetic source workbook (single sheet, like an INFRA3 export) and return its path
+def write_source(path, **options):
+    make_source_frame(**options).to_excel(path, index=False, engine='xlsxwriter')
+    return path
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Generate a synthetic INFRA3 source workbook.')
+    parser.add_argument('path', help='output .xlsx path')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--loan-tranches', type=int, default=20, help='loan tranche column groups (max 20)')
+    parser.add_argument('--cap-market-tranches', type=int, default=20, help='capital market column groups (max 20)')
+    parser.add_argument('--lenders', type=int, default=6, help='maximum lenders per tranche')
+    parser.add_argument('--sectors', type=int, default=3, help='maximum sub-sectors per deal')
+    parser.add_argument('--extra-columns', type=int, default=0, help='columns the curation does not read')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser
+
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+    write_source(args.path, rows=args.rows, loan_tranches=args.loan_tranches,
+                 cap_market_tranches=args.cap_market_tranches, lenders=args.lenders, sectors=args.sectors,
+                 extra_columns=args.extra_columns, seed=args.seed)
+    print(f'Wrote {args.rows} rows to {args.path}')
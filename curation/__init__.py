@@ -0,0 +1,40 @@
+# Curation engine for INFRA3 export files, usable without the Streamlit front end (main.py).
+# The names below are imported from their modules on first use, so that importing the package
+# (e.g. for the command line or in a worker process) loads neither pandas nor the mapping tables.
+import importlib
+
+# Module of each name exported by the package
+EXPORTS = {
+    'create_destination_file': 'engine',
+    'create_destination_buffer': 'engine',
+    'curate_sheets': 'engine',
+    'default_destination_file_name': 'engine',
+    'MAPPINGS_VERSION': 'mappings',
+    'load_mappings': 'mappings',
+    'OUTPUT_FORMATS': 'formats',
+    'STREAM_FORMATS': 'formats',
+    'log_timings': 'timing',
+    'timings_frame': 'timing',
+    'curate_sheets_incremental': 'delta',
+    'load_manifest': 'delta',
+    'manifest_from_files': 'delta',
+    'save_manifest': 'delta',
+    'memory_frame': 'compact',
+    'stream_destination': 'stream',
+    'name_cache_frame': 'names',
+    'name_cache_stats': 'names',
+}
+
+__all__ = list(EXPORTS)
+
+
+def __getattr__(name):
+    if name not in EXPORTS:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(importlib.import_module(f'.{EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(EXPORTS))
@@ -0,0 +1,228 @@
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Only the formats are imported with the module: the curation modules (pandas, openpyxl, pyarrow and
+# the mapping tables) are imported by the functions that use them, so that the command line answers
+# --help or a usage error at once, and a spawned worker process loads only what its files need.
+from .formats import EXCEL_ENGINES, OUTPUT_FORMATS, STREAM_FORMATS
+
+
+# Expand the command-line sources (files, directories or glob patterns) into a sorted list of
+# .xlsx files, skipping Excel lock files ('~$...')
+def find_source_files(sources):
+    files = set()
+    for source in sources:
+        if os.path.isdir(source):
+            matches = glob.glob(os.path.join(source, '*.xlsx'))
+        else:
+            matches = glob.glob(source)
+        files.update(path for path in matches
+                     if path.lower().endswith('.xlsx') and not os.path.basename(path).startswith('~$'))
+    return sorted(files)
+
+
+# Path of the curated file for a source file, e.g. 'curated/curated_export.xlsx'
+def destination_path(source_file, output_dir, output_format='xlsx'):
+    name = os.path.splitext(os.path.basename(source_file))[0]
+    return os.path.join(output_dir, f'curated_{name}{OUTPUT_FORMATS[output_format][0]}')
+
+
+# Curate one source file into the output directory (runs in a worker process), chunk_rows source
+# rows at a time if given (see curation.stream). Returns the stage timings too when they are
+# requested, and the memory report of compact mode, otherwise None, and the company name cache
+# statistics of the worker process so far, keyed by its process ID.
+def curate_file(source_file, output_dir, engine='xlsxwriter', constant_memory=False, timings=False, stage_workers=1,
+                source_cache=None, output_format='xlsx', compact=False, chunk_rows=None):
+    from .engine import create_destination_file
+    from .names import name_cache_stats
+
+    start = time.perf_counter()
+    destination_file = destination_path(source_file, output_dir, output_format)
+    stage_timings = [] if timings else None
+    memory = [] if compact else None
+    if chunk_rows:
+        from .stream import stream_destination
+        stream_destination(source_file, destination_file, output_format, chunk_rows, stage_timings, stage_workers)
+    else:
+        create_destination_file(source_file, destination_file, engine=engine, constant_memory=constant_memory,
+                                timings=stage_timings, workers=stage_workers, source_cache=source_cache,
+                                output_format=output_format, compact=compact, memory=memory)
+    return destination_file, time.perf_counter() - start, stage_timings, memory, {os.getpid(): name_cache_stats()}
+
+
+# Curate one source file, re-curating only the transactions that changed since the previous
+# curation, given as a manifest file (updated afterwards) or as the previous source and curated files
+def curate_file_incremental(source_file, output_dir, manifest_file=None, previous_source=None,
+                            previous_curated=None, engine='xlsxwriter', constant_memory=False, timings=False,
+                            output_format='xlsx', compact=False):
+    from .delta import curate_sheets_incremental, load_manifest, manifest_from_files, save_manifest
+    from .output import write_output
+
+    start = time.perf_counter()
+    if previous_source is not None:
+        manifest = manifest_from_files(previous_source, previous_curated)
+    elif manifest_file is not None and os.path.exists(manifest_file):
+        manifest = load_manifest(manifest_file)
+    else:
+        manifest = None
+
+    stage_timings = [] if timings else None
+    memory = [] if compact else None
+    sheets, manifest, summary = curate_sheets_incremental(source_file, manifest, stage_timings, compact, memory)
+    destination_file = destination_path(source_file, output_dir, output_format)
+    write_output(sheets, destination_file, output_format, engine=engine, constant_memory=constant_memory,
+                 timings=stage_timings)
+    if manifest_file is not None:
+        save_manifest(manifest, manifest_file)
+    return destination_file, time.perf_counter() - start, stage_timings, memory, summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m curation',
+        description='Curate INFRA3 export files without the Streamlit app.')
+    parser.add_argument('sources', nargs='+',
+                        help='source .xlsx files, directories containing them, or glob patterns')
+    parser.add_argument('-o', '--output-dir', default='curated',
+                        help='directory for the curated files (default: %(default)s)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='number of worker processes (default: number of CPUs, %(default)s)')
+    parser.add_argument('--stage-workers', type=int, default=1,
+                        help='run the independent stages of each file concurrently on this many workers '
+                             '(default: %(default)s, one stage after another)')
+    parser.add_argument('--format', choices=list(OUTPUT_FORMATS), default='xlsx', dest='output_format',
+                        help='xlsx for an Excel workbook, or csv or parquet for a zip with one file per sheet, '
+                             'much faster to write (default: %(default)s)')
+    parser.add_argument('--engine', choices=EXCEL_ENGINES, default='xlsxwriter',
+                        help='Excel writer (default: %(default)s)')
+    parser.add_argument('--constant-memory', action='store_true',
+                        help="stream rows to disk while writing (xlsxwriter only)")
+    parser.add_argument('--chunk-rows', type=int,
+                        help='curate this many source rows at a time and append them to the output, so that '
+                             'memory does not grow with the size of the source (xlsx or csv only)')
+    parser.add_argument('--compact', action='store_true',
+                        help='hold repeated text in the finished sheets as categoricals until they are written '
+                             '(and in manifests), and print the memory of each sheet before and after; the '
+                             'peak memory of the curation is unchanged')
+    parser.add_argument('--source-cache',
+                        help='cache parsed sources in this directory, so that curating the same file again '
+                             'skips reading the workbook')
+    parser.add_argument('--timings', action='store_true',
+                        help='log the time and row counts of every stage as JSON lines on stderr, and print '
+                             'the hit rate of the company name cache')
+    parser.add_argument('--manifest',
+                        help='curate only transactions that changed since the run that wrote this manifest '
+                             '(a single source; the manifest is created or updated)')
+    parser.add_argument('--previous-source',
+                        help='curate only transactions that changed since this source file (with --previous-curated)')
+    parser.add_argument('--previous-curated',
+                        help='the file curated from --previous-source')
+    return parser
+
+
+# Incremental curation of a single source file (see curation.delta)
+def main_incremental(source_file, args):
+    from .compact import memory_frame
+    from .names import name_cache_frame, name_cache_stats
+    from .timing import log_timings
+
+    destination_file, seconds, stage_timings, memory, summary = curate_file_incremental(
+        source_file, args.output_dir, args.manifest, args.previous_source, args.previous_curated,
+        args.engine, args.constant_memory, args.timings, args.output_format, args.compact)
+    if summary['full_run']:
+        print(f"Curated all {summary['curated']} transaction(s): {summary['full_run']}")
+    else:
+        print(f"Curated {summary['curated']} new or changed transaction(s), reused {summary['reused']}, "
+              f"dropped {summary['deleted']} deleted")
+    print(f'{seconds:7.2f}s  {source_file} -> {destination_file}')
+    if memory is not None:
+        print(memory_frame(memory).to_string(index=False))
+    if stage_timings is not None:
+        log_timings(stage_timings, source=source_file)
+        print(name_cache_frame(name_cache_stats()).to_string(index=False))
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.workers < 1:
+        print('--workers must be at least 1', file=sys.stderr)
+        return 2
+
+    source_files = find_source_files(args.sources)
+    if not source_files:
+        print('No .xlsx source files found', file=sys.stderr)
+        return 1
+    incremental = args.manifest or args.previous_source or args.previous_curated
+    if incremental and (args.previous_source is None) != (args.previous_curated is None):
+        print('--previous-source and --previous-curated must be given together', file=sys.stderr)
+        return 2
+    if incremental and len(source_files) != 1:
+        print('Incremental curation takes a single source file', file=sys.stderr)
+        return 2
+    if args.chunk_rows is not None:
+        if args.chunk_rows < 1:
+            print('--chunk-rows must be at least 1', file=sys.stderr)
+            return 2
+        if incremental or args.compact or args.source_cache or args.output_format not in STREAM_FORMATS:
+            print(f"--chunk-rows can't be combined with incremental curation, --compact or --source-cache, "
+                  f"and writes {' or '.join(STREAM_FORMATS)}", file=sys.stderr)
+            return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.timings:
+        timing_handler = logging.StreamHandler()
+        timing_handler.setFormatter(logging.Formatter('%(message)s'))
+        timing_logger = logging.getLogger('curation.timing')
+        timing_logger.addHandler(timing_handler)
+        timing_logger.setLevel(logging.INFO)
+    if incremental:
+        return main_incremental(source_files[0], args)
+
+    # Imported in this process before the workers start, so that forked workers inherit them
+    from .compact import memory_frame
+    from .engine import create_destination_file  # noqa: F401
+    from .names import name_cache_frame
+    from .timing import log_timings
+
+    workers = min(args.workers, len(source_files))
+    print(f'Curating {len(source_files)} file(s) with {workers} worker(s) into {args.output_dir}')
+
+    failures = 0
+    source_bytes = 0
+    name_stats = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(curate_file, source_file, args.output_dir, args.engine, args.constant_memory,
+                            args.timings, args.stage_workers, args.source_cache, args.output_format,
+                            args.compact, args.chunk_rows): source_file
+            for source_file in source_files}
+        for future in as_completed(futures):
+            source_file = futures[future]
+            try:
+                destination_file, seconds, stage_timings, memory, worker_name_stats = future.result()
+            except Exception as e:
+                failures += 1
+                print(f'FAILED  {source_file}: {e}', file=sys.stderr)
+                continue
+            source_bytes += os.path.getsize(source_file)
+            name_stats.update(worker_name_stats)
+            print(f'{seconds:7.2f}s  {source_file} -> {destination_file}')
+            if memory is not None:
+                print(memory_frame(memory).to_string(index=False))
+            if stage_timings is not None:
+                log_timings(stage_timings, source=source_file)
+    elapsed = time.perf_counter() - start
+
+    curated = len(source_files) - failures
+    print(f'Curated {curated} of {len(source_files)} file(s) in {elapsed:.2f}s: '
+          f'{curated / elapsed:.2f} files/s, {source_bytes / 1e6 / elapsed:.2f} MB/s of source')
+    if args.timings:
+        print(name_cache_frame(stats for worker_stats in name_stats.values() for stats in worker_stats).to_string(index=False))
+    return 1 if failures else 0
@@ -0,0 +1,78 @@
+import pandas as pd
+
+# Text columns with at most this share of distinct values (role types, statuses, countries, static
+# labels such as 'Infrastructure') are held as categoricals in compact mode
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Columns of a memory report record, in display order
+MEMORY_COLUMNS = ['sheet', 'rows', 'bytes_before', 'bytes_after', 'saved_percent']
+
+
+# Compact form of a column, or the column itself when there is none. Only lossless conversions
+# are made: text columns (strings and blanks only) with few distinct values become categoricals,
+# and 'object' columns holding only floats (or only integers) become float (or integer) arrays.
+# Columns mixing types are left alone, as e.g. 25 and 25.0 would become the same value.
+def compact_column(values):
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind == 'string' and len(values) and values.nunique(dropna=False) <= CATEGORY_MAX_UNIQUE_RATIO * len(values):
+        # Categories keep the column's dtype, so that expand_frame gives back the same column
+        return values.astype(pd.CategoricalDtype(pd.Index(values.dropna().unique(), dtype=values.dtype)))
+    if values.dtype == object and kind == 'floating':
+        return values.astype(float)
+    if values.dtype == object and kind == 'integer' and values.notna().all():
+        return values.astype('int64')
+    return values
+
+
+def compact_frame(df):
+    return pd.DataFrame({column: compact_column(df[column]) for column in df.columns}, index=df.index)
+
+
+# Memory held by a DataFrame, strings included
+def memory_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+# Compact every curated sheet (see compact_column). Given a memory list, a record of each sheet's
+# memory before and after is appended to it (see memory_frame). This shrinks the sheets held after
+# the curation (e.g. until they are written, or in a manifest), not the peak memory of the curation:
+# the stages build the sheets at full size first. The figures are pandas' deep memory usage, which
+# counts a string repeated on many rows once per row, so they overstate what the process saves.
+def compact_sheets(sheets, memory=None):
+    compacted = {}
+    for sheet_name, df in sheets.items():
+        compacted[sheet_name] = compact_frame(df)
+        if memory is not None:
+            before, after = memory_bytes(df), memory_bytes(compacted[sheet_name])
+            memory.append({
+                'sheet': sheet_name,
+                'rows': len(df),
+                'bytes_before': before,
+                'bytes_after': after,
+                'saved_percent': round(100 * (1 - after / before), 1) if before else None,
+            })
+    return compacted
+
+
+# A sheet as it was before compact_sheets: categoricals become plain columns again. Writers call
+# this one sheet at a time, so only the sheet being written is ever held in full.
+def expand_frame(df):
+    categorical = [column for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)]
+    if not categorical:
+        return df
+    df = df.copy(deep=False)
+    for column in categorical:
+        df[column] = df[column].astype(df[column].cat.categories.dtype)
+    return df
+
+
+# Memory report as a table, with a final row for all sheets
+def memory_frame(memory):
+    memory_df = pd.DataFrame(list(memory), columns=MEMORY_COLUMNS)
+    if len(memory_df):
+        before, after = memory_df['bytes_before'].sum(), memory_df['bytes_after'].sum()
+        total = pd.DataFrame([{
+            'sheet': 'total', 'rows': memory_df['rows'].sum(), 'bytes_before': before, 'bytes_after': after,
+            'saved_percent': round(100 * (1 - after / before), 1) if before else None}], columns=MEMORY_COLUMNS)
+        memory_df = pd.concat([memory_df, total], ignore_index=True)
+    return memory_df
@@ -0,0 +1,200 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .compact import compact_sheets, expand_frame
+from .engine import BIDDER_SOURCES, EVENT_DETAILS, curate_transactions, tranche_role_sources
+from .mappings import EVENT_TYPE, MAPPINGS_VERSION, map_values
+from .reader import read_source
+from .timing import run_stage
+
+logger = logging.getLogger(__name__)
+
+# Version of the manifest layout written by build_manifest
+MANIFEST_FORMAT = 1
+
+# Curated sheets with one or more rows per transaction, which are reused for unchanged transactions.
+# The other sheets are empty templates and always come from the new run.
+INCREMENTAL_SHEETS = ['Transaction', 'Events', 'Bidders_Any', 'Tranches', 'Tranche_Roles_Any']
+
+
+# Fingerprint of every source row, indexed by 'Transaction Upload ID'. Values are hashed with
+# their types, so 25 and 25.0 count as a change. Returns None when the IDs are blank or not
+# unique, as rows can't then be matched between exports.
+def source_fingerprints(transaction_df):
+    transaction_ids = transaction_df["Transaction Upload ID"]
+    if transaction_ids.isna().any() or transaction_ids.duplicated().any():
+        return None
+    columns = sorted(transaction_df.columns)
+    hashes = pd.util.hash_pandas_object(transaction_df[columns], index=False).to_numpy()
+    return pd.Series(hashes, index=pd.Index(transaction_ids.to_numpy(dtype=object), dtype=object))
+
+
+# Everything the next incremental run needs: the row fingerprints of the source and the curated sheets
+def build_manifest(transaction_df, sheets, fingerprints=None):
+    return {
+        'format': MANIFEST_FORMAT,
+        'mappings_version': MAPPINGS_VERSION,
+        'columns': sorted(transaction_df.columns),
+        'fingerprints': source_fingerprints(transaction_df) if fingerprints is None else fingerprints,
+        'sheets': sheets,
+    }
+
+
+# Manifests are pickled (the curated sheets keep their exact values and types), so only load
+# manifests written by save_manifest
+def save_manifest(manifest, path):
+    pd.to_pickle(manifest, path)
+
+
+def load_manifest(path):
+    return pd.read_pickle(path)
+
+
+# Read a curated workbook back into its sheets. Cells keep the type openpyxl gives them, and
+# 'Event Date' is turned back into dates. A number such as 25.0 is read back as 25, so column
+# widths may differ slightly from a full run; manifests don't have this problem.
+def read_curated_workbook(curated_file):
+    sheets = pd.read_excel(curated_file, sheet_name=None, dtype=object, engine='openpyxl')
+    if 'Events' in sheets:
+        event_dates = sheets['Events']['Event Date']
+        sheets['Events']['Event Date'] = event_dates.map(lambda value: value.date() if hasattr(value, 'date') else value)
+    return sheets
+
+
+# Build a manifest from a previous source file and the workbook curated from it
+def manifest_from_files(previous_source, previous_curated):
+    return build_manifest(read_source(previous_source), read_curated_workbook(previous_curated))
+
+
+# Block of each Events row, i.e. the position in EVENT_DETAILS of the date column it came from.
+# A 'Current status' event keeps its source date and mapped status; any other event is
+# identified by its static label. Duplicates were dropped keeping the 'Current status' row.
+def event_blocks(events_df, transaction_df):
+    status_types = map_values(transaction_df["Current status"], EVENT_TYPE).to_numpy(dtype=object)
+    status_dates = pd.to_datetime(
+        pd.Series(transaction_df["Current status date"].to_numpy(dtype=object), dtype=object)).dt.date.to_numpy(dtype=object)
+    positions = lookup(pd.Index(transaction_df["Transaction Upload ID"].to_numpy(dtype=object), dtype=object),
+                       events_df["Transaction Upload ID"])
+
+    static_blocks = {map_values(label, EVENT_TYPE): position
+                     for position, (_, label) in enumerate(EVENT_DETAILS) if label != "Current status"}
+    from_status = (
+        (events_df["Event Type"].to_numpy(dtype=object) == status_types[positions])
+        & (events_df["Event Date"].to_numpy(dtype=object) == status_dates[positions]))
+    blocks = events_df["Event Type"].map(static_blocks).fillna(0).to_numpy(dtype=int)
+    return np.where(from_status, 0, blocks)
+
+
+# Block of each Tranches row: loan tranches by number, then capital market tranches by number,
+# then equity, following the order in which the full curation builds them
+def tranche_blocks(tranches_df):
+    suffixes = tranche_suffixes(tranches_df)
+    parts = suffixes.str.extract(r'^-(L|CM|E)(\d*)$')
+    numbers = pd.to_numeric(parts[1], errors='coerce').fillna(0).to_numpy(dtype=int)
+    offsets = parts[0].map({'L': 0, 'CM': 100, 'E': 200}).fillna(300).to_numpy(dtype=int)
+    return offsets + numbers
+
+
+# 'Tranche Upload ID' without the transaction ID in front of it, e.g. '-L2'
+def tranche_suffixes(df):
+    return df["Tranche Upload ID"].astype(object).astype(str).str.extract(r'(-(?:L|CM|E)\d*)$', expand=False)
+
+
+# Position of each value in index, or -1 (a hash lookup on object values, much faster than
+# Series.isin/map on pandas' Arrow-backed strings)
+def lookup(index, values):
+    return index.get_indexer(pd.Series(values, dtype=object).to_numpy(dtype=object))
+
+
+# Put the rows of a merged sheet in the order a full curation of the source gives them: by
+# block (the source column or tranche group a row comes from), then by source row. Rows of the
+# same transaction and block keep their order.
+def order_sheet(sheet_name, sheet_df, transaction_df):
+    transaction_ids = pd.Index(transaction_df["Transaction Upload ID"].to_numpy(dtype=object), dtype=object)
+    row_positions = lookup(transaction_ids, sheet_df["Transaction Upload ID"])
+
+    if sheet_name == 'Events':
+        blocks = event_blocks(sheet_df, transaction_df)
+    elif sheet_name == 'Bidders_Any':
+        role_types = {role_type: position for position, role_type in enumerate(BIDDER_SOURCES.values())}
+        blocks = sheet_df["Role Type"].map(role_types).to_numpy(dtype=int)
+    elif sheet_name == 'Tranches':
+        blocks = tranche_blocks(sheet_df)
+    elif sheet_name == 'Tranche_Roles_Any':
+        suffix_blocks = {suffix: position for position, (_, suffix) in enumerate(tranche_role_sources(transaction_df.columns))}
+        blocks = tranche_suffixes(sheet_df).map(suffix_blocks).to_numpy(dtype=int)
+    else:
+        blocks = np.zeros(len(sheet_df), dtype=int)
+
+    order = np.lexsort((row_positions, blocks))
+    return sheet_df.iloc[order].reset_index(drop=True)
+
+
+# Why the manifest can't be used for an incremental run, or None if it can
+def full_run_reason(manifest, transaction_df, fingerprints):
+    if manifest is None:
+        return 'no previous curation'
+    if manifest.get('format') != MANIFEST_FORMAT:
+        return 'unknown manifest format'
+    if manifest['mappings_version'] != MAPPINGS_VERSION:
+        return 'mapping tables changed'
+    if manifest['columns'] != sorted(transaction_df.columns):
+        return 'source columns changed'
+    if fingerprints is None or manifest['fingerprints'] is None:
+        return "'Transaction Upload ID' is blank or not unique"
+    return None
+
+
+# Merge the reused rows of unchanged transactions with the rows curated for the others
+def merge_sheets(previous_sheets, new_sheets, unchanged_ids, transaction_df):
+    sheets = {}
+    for sheet_name, new_df in new_sheets.items():
+        if sheet_name not in INCREMENTAL_SHEETS:
+            sheets[sheet_name] = new_df
+            continue
+        previous_df = expand_frame(previous_sheets[sheet_name])
+        reused_df = previous_df[lookup(unchanged_ids, previous_df["Transaction Upload ID"]) >= 0]
+        parts = [df for df in (reused_df, new_df) if len(df)]
+        merged_df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else (parts[0] if parts else new_df)
+        sheets[sheet_name] = order_sheet(sheet_name, merged_df, transaction_df)
+    return sheets
+
+
+# Curate a source file, re-running the sheet builders only for transactions that are new or whose
+# source row changed since the curation recorded in the manifest (see build_manifest,
+# manifest_from_files). Rows of unchanged transactions are reused, and rows of transactions no
+# longer in the source are dropped. Returns the curated sheets, the manifest for the next run and
+# a summary of what was re-curated. Without a usable manifest every transaction is curated.
+# compact and memory are as for curate_sheets; compact sheets also make smaller manifests.
+def curate_sheets_incremental(source_file, manifest=None, timings=None, compact=False, memory=None):
+    transaction_df = run_stage(timings, 'read_source', read_source, source_file)
+    fingerprints = run_stage(timings, 'source_fingerprints', source_fingerprints, transaction_df)
+    reason = full_run_reason(manifest, transaction_df, fingerprints)
+
+    if reason is not None:
+        logger.info("Curating all %d transactions: %s", len(transaction_df), reason)
+        sheets = curate_transactions(transaction_df, timings)
+        if compact:
+            sheets = run_stage(timings, 'compact_sheets', compact_sheets, sheets, memory)
+        summary = {'full_run': reason, 'curated': len(transaction_df), 'reused': 0, 'deleted': 0}
+        return sheets, build_manifest(transaction_df, sheets, fingerprints), summary
+
+    # Compared as uint64: converting the hashes to float would make distinct hashes equal
+    previous_fingerprints = manifest['fingerprints']
+    known = fingerprints.index.isin(previous_fingerprints.index)
+    unchanged = known & (fingerprints.to_numpy() == previous_fingerprints.reindex(fingerprints.index, fill_value=0).to_numpy())
+    unchanged_ids = fingerprints.index[unchanged]
+    deleted = (~previous_fingerprints.index.isin(fingerprints.index)).sum()
+
+    new_sheets = curate_transactions(transaction_df[~unchanged], timings)
+    sheets = run_stage(timings, 'merge_sheets', merge_sheets, manifest['sheets'], new_sheets, unchanged_ids,
+                       transaction_df, rows_in=len(transaction_df))
+    if compact:
+        sheets = run_stage(timings, 'compact_sheets', compact_sheets, sheets, memory)
+
+    summary = {'full_run': None, 'curated': int((~unchanged).sum()), 'reused': len(unchanged_ids), 'deleted': int(deleted)}
+    logger.info("Curated %d new or changed transactions, reused %d, dropped %d deleted",
+                summary['curated'], summary['reused'], summary['deleted'])
+    return sheets, build_manifest(transaction_df, sheets, fingerprints), summary
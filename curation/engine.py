@@ -0,0 +1,591 @@
+import pandas as pd
+import numpy as np
+import io
+import re
+import pytz
+from datetime import datetime
+from .mappings import TRANSACTION_STATUS, TRANSACTION_TYPE, REGION_COUNTRY, CONTRACT, EVENT_TYPE, CLIENT_COUNTERPARTY, CLIENT_COUNTERPARTY_PATTERN, CLIENT_COUNTERPARTY_PRIORITY, TRANCHE_TERTIARY_TYPE, map_values, map_sectors
+from .names import clean_company_name, normalize_names, strip_role_tags
+from .output import OUTPUT_FORMATS, write_output
+from .reader import read_source
+from .source_cache import read_source_cached
+from .compact import compact_sheets
+from .graph import run_graph
+from .timing import run_stage
+
+# Define a function to extract numerical value from a string globally
+def extract_numerical_value(text):
+    match = re.search(r'[\d,.]+', str(text))
+    return match.group() if match else ''
+
+def process_transaction_sheet(transaction_df):
+    # Ensure 'Helper_Any Level Sectors' exists (in a copy, as other stages read the source rows at the same time)
+    transaction_df = transaction_df.copy(deep=False)
+    if 'Helper_Any Level Sectors' not in transaction_df.columns:
+        transaction_df['Helper_Any Level Sectors'] = ''
+
+    # Map columns for the 'Transaction' sheet with transformations
+    transaction_df["Helper_Any Level Sectors"] = transaction_df["Helper_Any Level Sectors"].fillna('')
+    return pd.DataFrame({
+        "Transaction Upload ID": transaction_df["Transaction Upload ID"],
+        "Transaction Name": transaction_df["Transaction Name"],
+        "Transaction Asset Class": "Infrastructure",  # Static value for all rows
+        "Transaction Status": map_values(transaction_df.get("Current status", ""), TRANSACTION_STATUS),  # Using .get to avoid KeyError if not present
+        "Finance Type": "",
+        "Transaction Type": map_values(transaction_df.get("Type", ""), TRANSACTION_TYPE),
+        "Unknown Asset": "",
+        "Underlying Asset Configuration": "",
+        "Transaction Local Currency": transaction_df["Transaction Currency"].apply(extract_numerical_value),  # Extract numerical value
+        "Transaction Value (Local Currency)": transaction_df.get("Transaction size (m)", ""),
+        "Transaction Debt (Local Currency)": "",
+        "Transaction Equity (Local Currency)": "",
+        "Debt/Equity Ratio": "",
+        "Underlying Number of Assets": "",
+        "Region - Country": map_values(transaction_df.get("Geography", ""), REGION_COUNTRY),
+        "Region - State": "",
+        "Region - City": "",
+        "Any Level Sectors": transaction_df.get("Sector", "") + ", " + map_sectors(transaction_df.get("Sub-Sector", "")),
+        "PPP": transaction_df.get("PPP", ""),
+        "Concession Period": transaction_df.get("Duration", ""),
+        "Contract": map_values(transaction_df.get("Delivery Model", ""), CONTRACT),
+        "SPV": transaction_df.get("SPV", ""),
+        "Active": "TRUE",
+        "Helper_Any Level Sectors": transaction_df.get("Sector", "") + ", " + transaction_df.get("Sub-Sector", "")
+    })
+
+# Date columns of the source file with the event type each one records
+EVENT_DETAILS = [
+    ("Current status date", "Current status"),  # Dynamic label copied from the source file
+    ("Financial close", "Financial Close"),  # Static label
+    ("Transaction Launch", "Announced"),
+    ("RFP returned", "Request for Proposals"),
+    ("Preferred Proponents", "Preferred Bidder"),
+    ("Expressions of Interest", "Expression of Interest"),
+    ("RFQ returned", "Request for Qualifications"),
+    ("Shortlisted proponents", "Shortlist")
+]
+
+def process_events_sheet(transaction_df):
+    row_count = len(transaction_df)
+    date_columns = [date_column for date_column, _ in EVENT_DETAILS]
+
+    # Reshape all date columns at once: one candidate event per source row and date column,
+    # ordered by date column then source row, keeping only rows with a date
+    event_dates = transaction_df[date_columns].to_numpy(dtype=object).T.ravel()
+    keep = pd.notna(event_dates)
+
+    # Determine the event type: static label, or copied from the 'Current status' column. Dates are
+    # parsed one date column at a time, as pandas infers a single format for all the values of a call
+    # and columns may be written in different formats.
+    event_types = np.empty(row_count * len(EVENT_DETAILS), dtype=object)
+    parsed_dates = []
+    for position, (_, event_type) in enumerate(EVENT_DETAILS):
+        block = slice(position * row_count, (position + 1) * row_count)
+        if event_type == "Current status":
+            event_types[block] = map_values(transaction_df[event_type], EVENT_TYPE).to_numpy(dtype=object)
+        else:
+            event_types[block] = map_values(event_type, EVENT_TYPE)
+        block_dates = pd.Series(event_dates[block][keep[block]], dtype=object)
+        parsed_dates.append(pd.to_datetime(block_dates, cache=True).dt.date.to_numpy(dtype=object))  # Convert to date only
+
+    events_df = pd.DataFrame({
+        "Transaction Upload ID": tile_column(transaction_df, "Transaction Upload ID", len(EVENT_DETAILS))[keep],
+        "Event Date": np.concatenate(parsed_dates),
+        "Event Type": event_types[keep],
+        "Event Title": ""  # Assuming this field is empty or to be populated later
+    })
+
+    # Remove rows with blank or "N/A" or "n/a" in 'Event Date'
+    events_df = events_df[~events_df["Event Date"].isin(["", "N/A", "n/a"])]
+
+    # Remove duplicate rows
+    events_df = events_df.drop_duplicates()
+
+    return events_df
+
+# Source columns of the 'Bidders_Any' sheet with the role type of the companies they list
+BIDDER_SOURCES = {
+    "Legal Advisors": "Legal Adviser",
+    "Technical Advisors": "Technical Adviser",
+    "Financial Advisors": "Financial Adviser",
+    "Vendors": "Divestor",
+    "Grantors": "Awarding Authority"
+}
+
+def process_bidders_any_sheet(transaction_df):
+    return process_transaction_data(transaction_df, BIDDER_SOURCES)
+
+def process_transaction_data(transaction_df, sources):
+    transaction_ids = transaction_df["Transaction Upload ID"].to_numpy(dtype=object)
+    parts = []
+
+    # Split each source column into one row per company, keeping source column, row and company order
+    for source_column, role_type in sources.items():
+        cells = transaction_df[source_column]
+        positions = np.flatnonzero(cells.notna().to_numpy())
+        cells = pd.Series(cells.to_numpy(dtype=object)[positions], index=positions, dtype=object)
+
+        # Determine the delimiter based on the column name
+        delimiter = ',' if source_column in ["Vendors", "Grantors"] else ';'
+
+        # Ensure the values are strings before splitting
+        companies = cells.astype(str).str.split(delimiter).explode().astype(object).str.strip()
+        companies = companies[companies.notna() & (companies != '')]
+        parts.append(pd.DataFrame({
+            "Transaction Upload ID": transaction_ids[companies.index.to_numpy(dtype=int)],
+            "Role Type": role_type,
+            "Company": companies.to_numpy(dtype=object)
+        }))
+
+    entries = pd.concat(parts, ignore_index=True)
+    companies = entries["Company"].astype(object)
+
+    # Determine Client Counterparty from the role tag in parentheses; when a name carries
+    # more than one tag, the one listed first in CLIENT_COUNTERPARTY wins
+    tags = companies.str.extractall(CLIENT_COUNTERPARTY_PATTERN)[0]
+    first_tags = tags.map(CLIENT_COUNTERPARTY_PRIORITY).groupby(level=0).min()
+    client_counterparty = first_tags.map(dict(enumerate(CLIENT_COUNTERPARTY.values()))).reindex(
+        entries.index, fill_value='')
+
+    # The role tags are removed from the company names by clean_bidder_names
+    return pd.DataFrame({
+        "Transaction Upload ID": entries["Transaction Upload ID"],
+        "Role Type": entries["Role Type"],
+        "Role Subtype": "",
+        "Company": companies,
+        "Fund": "",
+        "Bidder Status": "Successful",
+        "Client Counterparty": client_counterparty,
+        "Client Company Name": "",
+        "Fund Name": ""
+    }, columns=[
+        "Transaction Upload ID", "Role Type", "Role Subtype", "Company", "Fund",
+        "Bidder Status", "Client Counterparty", "Client Company Name", "Fund Name"])
+
+# Columns of the 'Tranches' sheet (the Helper_ columns are used for the value calculations)
+TRANCHES_COLUMNS = [
+    "Transaction Upload ID", "Tranche Upload ID", "Tranche Primary Type",
+    "Tranche Secondary Type", "Tranche Tertiary Type", "Value",
+    "Maturity Start Date", "Maturity End Date", "Tenor",
+    "Tranche ESG Type", "Helper_Tranche Value USD m",
+    "Helper_Transaction Value USD m", "Helper_Transaction Value LC"]
+
+# Structured form of 'Tranche Upload ID', carried by the tranche builders until the tranche types are
+# assigned: the family ('L' loan, 'CM' capital market, 'E' equity) and the tranche number (0 for equity)
+TRANCHE_FAMILIES = pd.CategoricalDtype(['L', 'CM', 'E'])
+TRANCHE_KEY_COLUMNS = ["Tranche Family", "Tranche Number"]
+
+# Numbers of the loan and capital market tranches that are debt (loans and bonds); all other tranches
+# count as equity. This is what matching 'Tranche Upload ID' on the endings 'L1'-'L3' and 'CM1'-'CM3'
+# gave, so e.g. 'T1-L11' and 'T1-CM12' are equity tranches too.
+DEBT_TRANCHE_NUMBERS = [1, 2, 3]
+
+# Stack the numbered columns of a group (e.g. 'Tranche {} Tenor' for each number) into one array,
+# number-major: all source rows for the first number, then all source rows for the next, ...
+def stack_columns(transaction_df, column_template, numbers):
+    columns = [column_template.format(i) for i in numbers]
+    return transaction_df[columns].to_numpy(dtype=object).T.ravel()
+
+# Repeat a per-transaction column once for every stacked group, using "" when the source doesn't have it
+def tile_column(transaction_df, column, repeats):
+    if column in transaction_df.columns:
+        values = transaction_df[column].to_numpy(dtype=object)
+    else:
+        values = np.full(len(transaction_df), "", dtype=object)
+    return np.tile(values, repeats)
+
+# Build tranche upload IDs such as 'T123-L1' or 'T123-CM2' from transaction IDs and tranche numbers
+def tranche_upload_ids(transaction_ids, prefix, numbers=None):
+    upload_ids = pd.Series(transaction_ids, dtype=object).astype(str) + prefix
+    if numbers is not None:
+        upload_ids = upload_ids + pd.Series(numbers).astype(str)
+    return upload_ids.to_numpy(dtype=object)
+
+# The TRANCHE_KEY_COLUMNS of tranches of one family
+def tranche_keys(family, numbers):
+    numbers = np.asarray(numbers, dtype=np.int64)
+    return {
+        "Tranche Family": pd.Categorical(np.full(len(numbers), family, dtype=object), dtype=TRANCHE_FAMILIES),
+        "Tranche Number": numbers,
+    }
+
+# Reshape the 'Loan Debt Tranche {i} Type' / 'Tranche {i} Tenor' / 'Tranche {i} Volume USD (m)' column
+# triplets (up to 20 of them) into one row per transaction and tranche, ordered by tranche then source row
+def expand_loan_tranches(transaction_df):
+    # Only tranches that have all three columns in the source are expanded
+    tranche_numbers = [i for i in range(1, 21) if all(
+        column in transaction_df.columns
+        for column in [f'Loan Debt Tranche {i} Type', f'Tranche {i} Tenor', f'Tranche {i} Volume USD (m)'])]
+    tranche_types = stack_columns(transaction_df, 'Loan Debt Tranche {} Type', tranche_numbers)
+    tranche_tenors = stack_columns(transaction_df, 'Tranche {} Tenor', tranche_numbers)
+    tranche_values = stack_columns(transaction_df, 'Tranche {} Volume USD (m)', tranche_numbers)
+
+    # Keep tranches where at least one of Type / Tenor / Volume is filled in
+    keep = pd.notna(tranche_types) | pd.notna(tranche_tenors) | pd.notna(tranche_values)
+
+    def tile(column):
+        return tile_column(transaction_df, column, len(tranche_numbers))[keep]
+
+    transaction_ids = tile("Transaction Upload ID")
+    numbers = np.repeat(np.array(tranche_numbers, dtype=int), len(transaction_df))[keep]
+
+    return pd.DataFrame({
+        "Transaction Upload ID": transaction_ids,
+        "Tranche Upload ID": tranche_upload_ids(transaction_ids, '-L', numbers),
+        "Tranche Primary Type": "",
+        "Tranche Secondary Type": "",
+        "Tranche Tertiary Type": tranche_types[keep],
+        "Value": "",
+        "Maturity Start Date": "",
+        "Maturity End Date": "",
+        "Tenor": tranche_tenors[keep],
+        "Tranche ESG Type": tile("Tranche ESG Type"),
+        "Helper_Tranche Value USD m": tranche_values[keep],
+        "Helper_Transaction Value USD m": tile("Transaction size USD(m)"),
+        "Helper_Transaction Value LC": tile("Transaction size (m)"),
+        **tranche_keys('L', numbers)
+    }, columns=TRANCHES_COLUMNS + TRANCHE_KEY_COLUMNS)
+
+# Convert a single value to float: commas and surrounding spaces are stripped from text, and
+# text that isn't a number counts as 0
+def safe_float_conversion(value):
+    if isinstance(value, str):
+        value = value.replace(',', '').strip()
+    try:
+        return float(value)
+    except ValueError:
+        return 0
+
+# safe_float_conversion for a whole column, as a float array. Text is parsed with to_numeric, then
+# converted exactly like float() would; only text it can't parse goes through safe_float_conversion.
+def to_float_values(values):
+    values = pd.Series(values.to_numpy(dtype=object), index=values.index)
+    if pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'mixed', 'mixed-integer'):
+        return values.to_numpy(dtype=float)
+
+    text = values.str.replace(',', '', regex=False).str.strip()
+    is_text = text.notna().to_numpy()
+    parsed = is_text & pd.to_numeric(text, errors='coerce').notna().to_numpy()
+    unparsed = is_text & ~parsed
+
+    result = np.empty(len(values))
+    result[~is_text] = values[~is_text].to_numpy(dtype=float)
+    result[parsed] = text[parsed].to_numpy(dtype=object).astype(float)
+    result[unparsed] = values[unparsed].map(safe_float_conversion).to_numpy(dtype=float)
+    return result
+
+# Columns of the 'Tranches' sheet computed by process_tranches_sheet (see computed_column)
+COMPUTED_TRANCHE_COLUMNS = ["Helper_Tranche Value USD m as % of Helper_Transaction Value USD m", "Value"]
+
+# A column computed where `computed` is set and 0 elsewhere. As with the row-by-row version, the
+# column holds integers when no row was computed.
+def computed_column(values, computed):
+    return values if computed.any() or not len(values) else values.astype(np.int64)
+
+def process_tranches_sheet(transaction_df):
+    # Expand loan tranches 1-20 into one row each
+    tranches_df = expand_loan_tranches(transaction_df)
+
+    # Convert the value columns to numbers once, then work on whole columns
+    tranche_values = to_float_values(tranches_df["Helper_Tranche Value USD m"])
+    transaction_values = to_float_values(tranches_df["Helper_Transaction Value USD m"])
+    local_values = to_float_values(tranches_df["Helper_Transaction Value LC"])
+
+    # Add the new column 'Helper_Tranche Value USD m as % of Helper_Transaction Value USD m' (0 where the transaction value is 0)
+    divisible = transaction_values != 0
+    with np.errstate(all='ignore'):
+        ratios = np.where(divisible, tranche_values / transaction_values, 0.0)
+    tranches_df["Helper_Tranche Value USD m as % of Helper_Transaction Value USD m"] = computed_column(ratios, divisible)
+
+    # Populate column F "Value" with results of multiplying columns "Helper_Tranche Value USD m as % of Helper_Transaction Value USD m" by "Helper_Transaction Value LC"
+    # (0 unless both are non-zero)
+    multiplied = (ratios != 0) & (local_values != 0)
+    with np.errstate(all='ignore'):
+        values = np.where(multiplied, ratios * local_values, 0.0)
+    tranches_df["Value"] = computed_column(values, multiplied)
+
+    # Update 'Tranche ESG Type' if 'Tranche Tertiary Type' contains 'Islamic' (without rows, the column is
+    # a float column, as with the row-by-row version)
+    islamic = tranches_df["Tranche Tertiary Type"].str.contains("Islamic", regex=False, na=False).to_numpy(dtype=bool)
+    esg_types = tranches_df["Tranche ESG Type"]
+    tranches_df["Tranche ESG Type"] = esg_types.where(~islamic, esg_types[islamic].map('{}, Tranche ESG Type'.format)) \
+        if len(tranches_df) else esg_types.astype(float)
+
+    # Replace words in 'Tranche Tertiary Type' based on the provided list
+    tranches_df["Tranche Tertiary Type"] = tranches_df["Tranche Tertiary Type"].replace(TRANCHE_TERTIARY_TYPE)
+
+    
+    return tranches_df
+
+def populate_additional_tranches(transaction_df, tranches_df):
+    new_tranches = []
+
+    # Capital market tranches up to a maximum of 20, ordered by tranche then source row
+    cap_market_numbers = [i for i in range(1, 21) if f'Capital Market Debt {i} Volume USD (m)' in transaction_df.columns]
+    volumes_usd = stack_columns(transaction_df, 'Capital Market Debt {} Volume USD (m)', cap_market_numbers)
+    keep = pd.notna(volumes_usd)
+    if keep.any():
+        def tile(column):
+            return tile_column(transaction_df, column, len(cap_market_numbers))[keep]
+
+        transaction_ids = tile("Transaction Upload ID")
+        numbers = np.repeat(np.array(cap_market_numbers, dtype=int), len(transaction_df))[keep]
+        new_tranches.append(pd.DataFrame({
+            "Transaction Upload ID": transaction_ids,
+            "Tranche Upload ID": tranche_upload_ids(transaction_ids, '-CM', numbers),
+            "Tranche Primary Type": "",
+            "Tranche Secondary Type": "",
+            "Tranche Tertiary Type": "",
+            "Value": "",
+            "Maturity Start Date": "",
+            "Maturity End Date": "",
+            "Tenor": "",
+            "Tranche ESG Type": "",
+            "Helper_Tranche Value USD m": volumes_usd[keep],
+            "Helper_Transaction Value USD m": tile("Transaction size USD(m)"),
+            "Helper_Transaction Value LC": tile("Transaction size (m)"),
+            **tranche_keys('CM', numbers)
+        }, columns=TRANCHES_COLUMNS + TRANCHE_KEY_COLUMNS))
+
+    # One equity tranche for every transaction with 'Equity Providers at FC'
+    if 'Equity Providers at FC' in transaction_df.columns:
+        equity_providers_df = transaction_df.dropna(subset=['Equity Providers at FC'])
+        if not equity_providers_df.empty:
+            if 'Equity at FC USD(m)' in equity_providers_df.columns:
+                equity_values = equity_providers_df['Equity at FC USD(m)'].map(extract_numerical_value).to_numpy(dtype=object)
+            else:
+                equity_values = extract_numerical_value('')
+
+            transaction_ids = tile_column(equity_providers_df, "Transaction Upload ID", 1)
+            new_tranches.append(pd.DataFrame({
+                "Transaction Upload ID": transaction_ids,
+                "Tranche Upload ID": tranche_upload_ids(transaction_ids, '-E'),
+                "Tranche Primary Type": "",
+                "Tranche Secondary Type": "",
+                "Tranche Tertiary Type": "Equity",
+                "Value": "",
+                "Maturity Start Date": "",
+                "Maturity End Date": "",
+                "Tenor": "",
+                "Tranche ESG Type": "",
+                "Helper_Tranche Value USD m": equity_values,
+                "Helper_Transaction Value USD m": tile_column(equity_providers_df, "Transaction size USD(m)", 1),
+                "Helper_Transaction Value LC": tile_column(equity_providers_df, "Transaction size (m)", 1),
+                **tranche_keys('E', np.zeros(len(transaction_ids)))
+            }, columns=TRANCHES_COLUMNS + TRANCHE_KEY_COLUMNS))
+
+    # Append all new tranches in one go
+    if new_tranches:
+        tranches_df = pd.concat([tranches_df] + new_tranches, ignore_index=True)
+
+    # Remove rows where 'Tranche Tertiary Type' is empty and 'Tranche Upload ID' ends in "-L1" to "-L20"
+    tranches_df = tranches_df[~((tranches_df['Tranche Tertiary Type'].astype(str).str.strip() == '') &
+                                (tranches_df['Tranche Family'] == 'L') & tranches_df['Tranche Number'].between(1, 20))]
+
+    return tranches_df
+
+# Splits on commas that are not inside parentheses, e.g. 'BNP (Agent, 20%), HSBC' -> ['BNP (Agent, 20%)', 'HSBC']
+COMPANY_LIST_PATTERN = re.compile(r',\s*(?![^()]*\))')
+
+# Share of a tranche in a company entry, e.g. 'BNP (20%)' -> '20'
+PERCENTAGE_PATTERN = re.compile(r'(\d+)%\)')
+
+# Source columns listing the companies of each tranche, with the suffix of their 'Tranche Upload ID',
+# in the order their rows appear in 'Tranche_Roles_Any'
+def tranche_role_sources(columns):
+    sources = [(f'Tranche {i} Lenders', f'-L{i}') for i in range(1, 21)]
+    for i in range(1, 21):
+        sources.append((f'Capital Market Debt {i} Underwriters', f'-CM{i}'))
+        sources.append((f'Capital Market Debt 2{i} Underwriters', f'-CM2{i}'))
+    sources.append(('Equity Providers at FC', '-E'))
+    return [(column, suffix) for column, suffix in sources if column in columns]
+
+def populate_tranche_roles_any(transaction_df, tranche_roles_any_df):
+    sources = tranche_role_sources(transaction_df.columns)
+    source_columns = [column for column, _ in sources]
+
+    # Gather all company lists in one reshape, ordered by source column then source row
+    company_lists = transaction_df[source_columns].to_numpy(dtype=object).T.ravel()
+    keep = pd.notna(company_lists)
+    transaction_ids = tile_column(transaction_df, "Transaction Upload ID", len(sources))[keep]
+    suffixes = np.repeat(np.array([suffix for _, suffix in sources], dtype=object), len(transaction_df))[keep]
+
+    # One row per company, split by comma unless within parentheses
+    companies = pd.Series(company_lists[keep], dtype=object).astype(str).str.split(COMPANY_LIST_PATTERN, regex=True)
+    companies = companies.explode().astype(object).str.strip()
+    companies = companies[companies.notna() & (companies != '')]
+    positions = companies.index.to_numpy(dtype=int)
+    transaction_ids = transaction_ids[positions]
+
+    tranche_roles_any_df = pd.DataFrame({
+        "Transaction Upload ID": transaction_ids,
+        "Tranche Upload ID": tranche_upload_ids(transaction_ids, '') + suffixes[positions],
+        "Tranche Role Type": "",
+        "Company": companies.to_numpy(dtype=object),
+        "Fund": "",
+        "Value": "",
+        "Percentage": companies.str.extract(PERCENTAGE_PATTERN, expand=False).fillna('').to_numpy(dtype=object),
+        "Comment": ""
+    }, columns=[
+        "Transaction Upload ID", "Tranche Upload ID", "Tranche Role Type", "Company", "Fund",
+        "Value", "Percentage", "Comment"
+    ])
+
+    return tranche_roles_any_df
+
+# Set 'Tranche Role Type' from the Primary/Secondary Type of the matching tranche (the first one,
+# if a 'Tranche Upload ID' appears more than once). Roles without a matching tranche are left as they are.
+def assign_tranche_role_types(tranche_roles_any_df, tranches_df):
+    tranche_types = tranches_df.drop_duplicates(subset='Tranche Upload ID', keep='first')
+    primary_type = tranche_types['Tranche Primary Type']
+    secondary_type = tranche_types['Tranche Secondary Type']
+    role_types = pd.Series(np.select(
+        [primary_type == 'Equity',
+         secondary_type == 'Bond',
+         secondary_type == 'Loan',
+         (primary_type == 'Debt') & (secondary_type == 'Non-Commercial Instrument')],
+        ['Sponsor', 'Bond Arranger', 'Debt Provider', 'Debt Provider'],
+        default=None), index=tranche_types['Tranche Upload ID'].to_numpy(), dtype=object)
+
+    # Hash lookup of every role's tranche in one pass
+    matched_role_types = tranche_roles_any_df['Tranche Upload ID'].map(role_types.dropna())
+    tranche_roles_any_df['Tranche Role Type'] = matched_role_types.where(
+        matched_role_types.notna(), tranche_roles_any_df['Tranche Role Type'])
+    return tranche_roles_any_df
+
+# Remove parentheses and their content from the bidder names, once per distinct name (see
+# curation.names). A stage of its own, run in this process, so that the name cache and its
+# statistics outlive the file even when the bidders are built in a worker process.
+def clean_bidder_names(bidders_any_df):
+    bidders_any_df['Company'] = normalize_names(bidders_any_df['Company'], strip_role_tags)
+    return bidders_any_df
+
+# Delete content within parentheses, trailing spaces and repeated spaces in between words, once
+# per distinct company name (see curation.names)
+def clean_company_names(tranche_roles_any_df):
+    tranche_roles_any_df['Company'] = normalize_names(tranche_roles_any_df['Company'], clean_company_name)
+    return tranche_roles_any_df
+
+# Clean up transaction names
+def clean_transaction_name(df):
+    df['Transaction Name'] = df['Transaction Name'].str.strip()  # Remove leading/trailing spaces
+    df['Transaction Name'] = df['Transaction Name'].replace(r'\s+', ' ', regex=True)  # Replace multiple spaces with single space
+    return df
+
+# Replace " and " with " & "
+def replace_and_with_ampersand(df):
+    df['Transaction Name'] = df['Transaction Name'].str.replace(' and ', ' & ')
+    return df
+
+# Name of the curated file, stamped with the current date and time in London
+def default_destination_file_name(output_format='xlsx'):
+    london_tz = pytz.timezone('Europe/London')
+    current_time = datetime.now(london_tz)
+    formatted_time = current_time.strftime('%Y%m%d_%H%M')
+    return f'curated_INFRA3_{formatted_time}{OUTPUT_FORMATS[output_format][0]}'
+
+# Update 'Tranche Primary Type', 'Tranche Secondary Type' and 'Tranche Tertiary Type' based on the tranche
+# family and number, then drop those key columns, which are not part of the sheet
+def assign_tranche_types(tranches_df):
+    debt_numbers = tranches_df['Tranche Number'].isin(DEBT_TRANCHE_NUMBERS)
+    loans = ((tranches_df['Tranche Family'] == 'L') & debt_numbers).to_numpy(dtype=bool)
+    bonds = ((tranches_df['Tranche Family'] == 'CM') & debt_numbers).to_numpy(dtype=bool)
+
+    tranches_df['Tranche Primary Type'] = np.where(loans | bonds, 'Debt', 'Equity')
+    tranches_df['Tranche Secondary Type'] = np.select([loans, bonds], ['Loan', 'Bond'], 'Equity')
+    tranches_df['Tranche Tertiary Type'] = tranches_df['Tranche Tertiary Type'].where(~bonds, 'Commercial Bond')
+    if tranches_df.empty:
+        # The column types the row-by-row version gave a sheet without rows
+        tranches_df = tranches_df.astype(
+            {'Tranche Primary Type': object, 'Tranche Secondary Type': object, 'Tranche Tertiary Type': float})
+    return tranches_df.drop(columns=TRANCHE_KEY_COLUMNS)
+
+# Curate a source file (a path or a binary file-like object) into the DataFrames of the curated
+# workbook, keyed by sheet name in output order. Given a timings list, the wall time and row
+# counts of every stage are appended to it (see curation.timing). With a source_cache directory,
+# parsed sources are cached there and not parsed again (see curation.source_cache). With
+# compact=True, the finished sheets hold repeated text as categoricals until they are written, and
+# given a memory list, the memory of each sheet before and after is appended to it (see curation.compact).
+# The sheets are compacted once the stages have built them, so the peak memory of the run is the same.
+def curate_sheets(source_file, timings=None, workers=1, source_cache=None, compact=False, memory=None):
+    # Load the columns used below from the first sheet of the source Excel file
+    if source_cache is None:
+        transaction_df = run_stage(timings, 'read_source', read_source, source_file)
+    else:
+        transaction_df = run_stage(timings, 'read_source', read_source_cached, source_file, source_cache)
+    sheets = curate_transactions(transaction_df, timings, workers)
+    if compact:
+        sheets = run_stage(timings, 'compact_sheets', compact_sheets, sheets, memory)
+    return sheets
+
+# The curation as a graph of stages: stage name -> (function, names of the stages or inputs whose
+# outputs it takes, pool). Every builder reads the source rows ('transaction_df') without changing
+# them; only the role-type assignment joins two branches (tranches and roles).
+CURATION_STAGES = {
+    'process_transaction_sheet': (process_transaction_sheet, ['transaction_df'], 'thread'),
+    'clean_transaction_name': (clean_transaction_name, ['process_transaction_sheet'], 'thread'),  # Clean transaction names
+    'replace_and_with_ampersand': (replace_and_with_ampersand, ['clean_transaction_name'], 'thread'),  # Replace " and " with " & "
+    'process_events_sheet': (process_events_sheet, ['transaction_df'], 'thread'),
+    'process_bidders_any_sheet': (process_bidders_any_sheet, ['transaction_df'], 'process'),
+    'clean_bidder_names': (clean_bidder_names, ['process_bidders_any_sheet'], 'thread'),
+    'process_tranches_sheet': (process_tranches_sheet, ['transaction_df'], 'thread'),
+    'populate_additional_tranches': (populate_additional_tranches, ['transaction_df', 'process_tranches_sheet'], 'thread'),
+    'assign_tranche_types': (assign_tranche_types, ['populate_additional_tranches'], 'thread'),
+    'populate_tranche_roles_any': (populate_tranche_roles_any, ['transaction_df', 'tranche_roles_any_df'], 'process'),
+    # Update 'Tranche Role Type' based on the type of the tranche each role belongs to
+    'assign_tranche_role_types': (assign_tranche_role_types, ['populate_tranche_roles_any', 'assign_tranche_types'], 'thread'),
+    # Clean the 'Company' column in the 'Tranche_Roles_Any' tab
+    'clean_company_names': (clean_company_names, ['assign_tranche_role_types'], 'thread'),
+}
+
+# Curate source rows already loaded with read_source (all of them, or a subset as in curation.delta).
+# With workers > 1, independent stages run concurrently in threads, and in processes for the
+# GIL-bound ones unless use_processes is False (see curation.graph), in the given pools if any;
+# the result is the same.
+def curate_transactions(transaction_df, timings=None, workers=1, use_processes=True, pools=None):
+    tranche_roles_any_df = pd.DataFrame(columns=[
+        "Transaction Upload ID", "Tranche Upload ID", "Role Type", "Company", "Fund", 
+        "Value", "Percentage", "Comment"])
+    outputs = run_graph(CURATION_STAGES, {'transaction_df': transaction_df, 'tranche_roles_any_df': tranche_roles_any_df},
+                        timings, workers, use_processes, pools)
+    
+    # Empty sheets expected by the upload template
+    underlying_asset_df = pd.DataFrame(columns=["Transaction Upload ID", "Asset Upload ID"])
+    tranche_pricings_df = pd.DataFrame(columns=[
+        "Tranche Upload ID", "Tranche Benchmark", "Basis Point From", "Basis Point To", "Period From", "Period To", "Period Duration", "Comment"])
+
+    return {
+        'Transaction': outputs['replace_and_with_ampersand'],
+        'Underlying_Asset': underlying_asset_df,
+        'Events': outputs['process_events_sheet'],
+        'Bidders_Any': outputs['clean_bidder_names'],
+        'Tranches': outputs['assign_tranche_types'],
+        'Tranche_Pricings': tranche_pricings_df,
+        'Tranche_Roles_Any': outputs['clean_company_names'],
+    }
+
+def create_destination_file(source_file, destination_file=None, engine='xlsxwriter', constant_memory=False,
+                            timings=None, workers=1, source_cache=None, output_format='xlsx', compact=False,
+                            memory=None):
+    # Create destination file name, unless one was given
+    destination_file_name = destination_file or default_destination_file_name(output_format)
+
+    # Save to new Excel file, with column widths fitted to the content (or to a zip of CSV or Parquet files)
+    sheets = curate_sheets(source_file, timings, workers, source_cache, compact, memory)
+    write_output(sheets, destination_file_name, output_format, engine=engine, constant_memory=constant_memory,
+                 timings=timings)
+
+    return destination_file_name
+
+# Curate a source given as bytes or a binary file-like object (e.g. an upload) and return the
+# curated workbook (or zip of CSV or Parquet files) as an in-memory buffer, without writing anything to disk
+def create_destination_buffer(source, engine='xlsxwriter', constant_memory=False, timings=None, workers=1,
+                              source_cache=None, output_format='xlsx', compact=False, memory=None):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+
+    buffer = io.BytesIO()
+    sheets = curate_sheets(source, timings, workers, source_cache, compact, memory)
+    write_output(sheets, buffer, output_format, engine=engine, constant_memory=constant_memory, timings=timings)
+    buffer.seek(0)
+    return buffer
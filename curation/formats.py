@@ -0,0 +1,16 @@
+# Output formats and writers on offer, kept apart from the writers themselves (curation.output) so
+# that the command line and the app can list them without importing pandas, pyarrow or openpyxl
+
+# Excel writers supported by write_excel
+EXCEL_ENGINES = ('xlsxwriter', 'openpyxl')
+
+# Output formats: one Excel workbook, or one CSV or Parquet file per sheet in a zip archive.
+# Each maps to the file name extension and MIME type of the curated file.
+OUTPUT_FORMATS = {
+    'xlsx': ('.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('.csv.zip', 'application/zip'),
+    'parquet': ('.parquet.zip', 'application/zip'),
+}
+
+# Output formats that sheets can be appended to chunk by chunk (see curation.stream)
+STREAM_FORMATS = ('xlsx', 'csv')
@@ -0,0 +1,89 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from .timing import run_stage
+
+# Where a stage runs when the graph runs concurrently: 'thread' for stages that spend their time in
+# numpy/pandas code releasing the GIL (or are too quick to be worth sending elsewhere), 'process'
+# for stages that spend it in Python code holding the GIL (row-wise applies, string splitting)
+STAGE_POOLS = ('thread', 'process')
+
+
+# Run one stage and return its output with its timing records (called in a worker thread or process)
+def call_stage(stage, func, args, timed):
+    timings = [] if timed else None
+    return run_stage(timings, stage, func, *args), timings
+
+
+# The thread pool and, if any stage runs in a process (and use_processes is set), the process pool
+# for running a graph of stages on `workers` workers. run_graph creates them for each run unless
+# given them, so a caller running the graph many times (e.g. once per chunk) can create them once.
+def graph_pools(stages, workers, use_processes=True):
+    uses_processes = use_processes and any(pool == 'process' for _, _, pool in stages.values())
+    return ThreadPoolExecutor(max_workers=workers), ProcessPoolExecutor(max_workers=workers) if uses_processes else None
+
+
+def shutdown_pools(pools):
+    for pool in pools:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+# Stage names in an order where every stage comes after the stages whose outputs it takes,
+# following the order of the graph where possible
+def topological_order(stages, inputs):
+    order = []
+    available = set(inputs)
+    pending = list(stages)
+    while pending:
+        ready = [stage for stage in pending if all(name in available for name in stages[stage][1])]
+        if not ready:
+            raise ValueError(f"Stages with missing or circular inputs: {', '.join(pending)}")
+        stage = ready[0]
+        order.append(stage)
+        available.add(stage)
+        pending.remove(stage)
+    return order
+
+
+# Run a graph of stages, given as stage name -> (function, names of its inputs, pool), where each
+# input names another stage or one of the given inputs. With workers=1 the stages run one after
+# another; otherwise each stage starts as soon as its inputs are ready, in a thread or, for 'process'
+# stages, a process (unless use_processes is False), using the pools from graph_pools if given
+# (they are left running). A stage's output depends only on its inputs, so the outputs are the
+# same either way, and timings are recorded in graph order.
+# Returns the inputs and the output of every stage, by name.
+def run_graph(stages, inputs, timings=None, workers=1, use_processes=True, pools=None):
+    order = topological_order(stages, inputs)
+    outputs = dict(inputs)
+    records = {}
+    timed = timings is not None
+
+    if workers <= 1:
+        for stage in order:
+            func, names, _ = stages[stage]
+            outputs[stage], records[stage] = call_stage(stage, func, [outputs[name] for name in names], timed)
+    else:
+        owns_pools = pools is None
+        thread_pool, process_pool = graph_pools(stages, workers, use_processes) if owns_pools else pools
+        pending = list(order)
+        running = {}
+        try:
+            while pending or running:
+                for stage in [stage for stage in pending if all(name in outputs for name in stages[stage][1])]:
+                    func, names, pool = stages[stage]
+                    executor = process_pool if pool == 'process' and process_pool is not None else thread_pool
+                    future = executor.submit(call_stage, stage, func, [outputs[name] for name in names], timed)
+                    running[future] = stage
+                    pending.remove(stage)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    outputs[stage], records[stage] = future.result()
+        finally:
+            if owns_pools:
+                shutdown_pools((thread_pool, process_pool))
+
+    if timed:
+        for stage in order:
+            timings.extend(records[stage])
+    return outputs
@@ -0,0 +1,127 @@
+import functools
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Replacement tables for the curated sheets live in data files, one per table, in this directory.
+# Each file holds the table's revision number, a description and the table itself:
+#   {"version": 1, "description": "...", "table": {"Cancelled": "Cancelled", ...}}
+MAPPING_TABLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mapping_tables')
+
+# Tables of the registry, by file name. The content version hashes them in this order.
+MAPPING_TABLES = [
+    'transaction_status', 'transaction_type', 'region_country', 'contract', 'any_level_sectors', 'event_type',
+    'client_counterparty', 'tranche_tertiary_type',
+]
+
+
+# Revision number and table of a mapping file
+def load_table(path):
+    with open(path, encoding='utf-8') as f:
+        content = json.load(f)
+    if not isinstance(content, dict) or not isinstance(content.get('version'), int) \
+            or not isinstance(content.get('table'), dict) \
+            or not all(isinstance(value, str) for value in content['table'].values()):
+        raise ValueError(f"{path} is not a mapping table: expected a 'version' number and a 'table' of strings")
+    return content['version'], content['table']
+
+
+# Precompiled form of a table: its keys as an index and the replacements as an array in the same
+# order, so that a column's distinct values are looked up all at once (see map_values)
+def compile_table(table):
+    return pd.Index(list(table), dtype=object), np.array(list(table.values()), dtype=object)
+
+
+# Content version of the tables. It changes whenever any table changes, so results cached by the
+# app or by incremental curation can be invalidated when the mappings are edited.
+def mappings_version(tables):
+    return hashlib.sha256(json.dumps(
+        [tables[name] for name in MAPPING_TABLES], sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+# Registry of the mapping tables: their content version, the revision of each file, the tables and
+# their precompiled lookups. The files are read once per process (the app also shares the registry
+# across sessions, see main.py).
+@functools.lru_cache(maxsize=None)
+def load_mappings(directory=MAPPING_TABLES_DIR):
+    table_versions, tables = {}, {}
+    for name in MAPPING_TABLES:
+        table_versions[name], tables[name] = load_table(os.path.join(directory, f'{name}.json'))
+    return {
+        'version': mappings_version(tables),
+        'table_versions': table_versions,
+        'tables': tables,
+        'lookups': {name: compile_table(table) for name, table in tables.items()},
+    }
+
+
+MAPPINGS = load_mappings()
+
+TRANSACTION_STATUS = MAPPINGS['tables']['transaction_status']
+TRANSACTION_TYPE = MAPPINGS['tables']['transaction_type']
+REGION_COUNTRY = MAPPINGS['tables']['region_country']
+CONTRACT = MAPPINGS['tables']['contract']
+ANY_LEVEL_SECTORS = MAPPINGS['tables']['any_level_sectors']
+EVENT_TYPE = MAPPINGS['tables']['event_type']
+TRANCHE_TERTIARY_TYPE = MAPPINGS['tables']['tranche_tertiary_type']
+
+# 'Client Counterparty' for each role tag found in parentheses after a bidder name, e.g.
+# 'Linklaters (Funders)'. Listed in priority order: the first matching tag wins.
+CLIENT_COUNTERPARTY = MAPPINGS['tables']['client_counterparty']
+CLIENT_COUNTERPARTY_PRIORITY = {tag: priority for priority, tag in enumerate(CLIENT_COUNTERPARTY)}
+CLIENT_COUNTERPARTY_PATTERN = re.compile(r'\((' + '|'.join(re.escape(tag) for tag in CLIENT_COUNTERPARTY) + r')\)')
+
+MAPPINGS_VERSION = MAPPINGS['version']
+
+
+# Apply a function to each distinct value of a column once and broadcast the results back
+# to every row. Blank (NaN) cells are passed through unchanged. A vectorized function is given
+# all the distinct values at once.
+def map_unique(values, func, vectorized=False):
+    codes, uniques = pd.factorize(values)
+    if len(uniques) == 0:
+        return values.copy()
+    if vectorized:
+        mapped = np.asarray(func(uniques), dtype=object)
+    else:
+        mapped = np.array([func(value) for value in uniques], dtype=object)
+    mapped = pd.Series(mapped.take(codes), index=values.index, dtype=object)
+    return mapped.where(codes != -1, values)
+
+
+# Precompiled lookup of a table: the registry's own for its tables, compiled here for any other
+def table_lookup(table):
+    for name, registry_table in MAPPINGS['tables'].items():
+        if registry_table is table:
+            return MAPPINGS['lookups'][name]
+    return compile_table(table)
+
+
+# Replace values found in the table and keep everything else as it is
+def map_values(values, table):
+    if not isinstance(values, pd.Series):
+        return table.get(values, values)
+    keys, replacements = table_lookup(table)
+
+    def replace_uniques(uniques):
+        positions = keys.get_indexer(uniques)
+        found = positions != -1
+        mapped = np.asarray(uniques, dtype=object).copy()
+        mapped[found] = replacements[positions[found]]
+        return mapped
+
+    return map_unique(values, replace_uniques, vectorized=True)
+
+
+# Replace each comma-separated sector, e.g. 'Roads, Ports' -> 'Transport, Road, Transport, Port'
+def map_sectors(sectors, table=ANY_LEVEL_SECTORS):
+    def replace_sectors(value):
+        return ', '.join(table.get(sector.strip(), sector.strip()) for sector in value.split(','))
+
+    if not isinstance(sectors, pd.Series):
+        return replace_sectors(sectors)
+    return map_unique(sectors, replace_sectors)
@@ -0,0 +1,96 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .mappings import map_unique
+
+# Most distinct names kept by each normalizer's cache; the least recently used are evicted beyond
+# this. The caches live as long as the process, so a batch worker or the app reuses them from one
+# file to the next (the same banks and sponsors appear in every export).
+NAME_CACHE_SIZE = 100_000
+
+# Matches content in parentheses together with the surrounding spaces, e.g. ' (Funders) '
+PARENTHESES_PATTERN = re.compile(r'\s*\(.*?\)\s*')
+
+# Two or more spaces in between words
+SPACES_PATTERN = re.compile(r'\s{2,}')
+
+# Columns of a name cache statistics record, in display order (see name_cache_frame)
+NAME_STATS_COLUMNS = ['normalizer', 'rows', 'distinct', 'hits', 'misses', 'seconds']
+
+# Normalized names and running statistics of each normalizer, by normalizer name. The app curates
+# uploads of several sessions in threads, hence the lock.
+NAME_CACHES = {}
+NAME_STATS = {}
+NAME_CACHE_LOCK = threading.Lock()
+
+
+# Bidder name without its role tags, e.g. 'Linklaters (Funders) ' -> 'Linklaters'
+def strip_role_tags(name):
+    return PARENTHESES_PATTERN.sub('', name).strip()
+
+
+# Company name without parentheses and their content, trailing spaces or repeated spaces in between words
+def clean_company_name(name):
+    return SPACES_PATTERN.sub(' ', strip_role_tags(name))
+
+
+# Normalize a column of names with normalizer(name). Each distinct name is normalized once and the
+# result broadcast back to every row; names normalized before (in this file or an earlier one) are
+# taken from the normalizer's cache. Blank (NaN) cells are passed through, and the column keeps its dtype.
+def normalize_names(values, normalizer):
+    def normalize_uniques(uniques):
+        uniques = list(uniques)
+        normalized = np.empty(len(uniques), dtype=object)
+        with NAME_CACHE_LOCK:
+            cache = NAME_CACHES.setdefault(normalizer.__name__, OrderedDict())
+            missing = []
+            for position, name in enumerate(uniques):
+                if name in cache:
+                    cache.move_to_end(name)
+                    normalized[position] = cache[name]
+                else:
+                    missing.append(position)
+
+        start = time.perf_counter()
+        for position in missing:
+            normalized[position] = normalizer(uniques[position])
+        seconds = time.perf_counter() - start
+
+        with NAME_CACHE_LOCK:
+            for position in missing:
+                cache[uniques[position]] = normalized[position]
+            while len(cache) > NAME_CACHE_SIZE:
+                cache.popitem(last=False)
+            stats = NAME_STATS.setdefault(normalizer.__name__, {'rows': 0, 'distinct': 0, 'hits': 0, 'misses': 0, 'seconds': 0.0})
+            stats['rows'] += int(values.notna().sum())
+            stats['distinct'] += len(uniques)
+            stats['hits'] += len(uniques) - len(missing)
+            stats['misses'] += len(missing)
+            stats['seconds'] += seconds
+        return normalized
+
+    return map_unique(values, normalize_uniques, vectorized=True).astype(values.dtype)
+
+
+# Running statistics of every normalizer in this process, as records (see name_cache_frame)
+def name_cache_stats():
+    with NAME_CACHE_LOCK:
+        return [{'normalizer': normalizer, **stats} for normalizer, stats in NAME_STATS.items()]
+
+
+# Name cache statistics as a table, one row per normalizer (records of several processes are added
+# up): names normalized, distinct names per file, cache hits among them, the hit rate, the time spent
+# normalizing the misses, and an estimate of the time saved, i.e. every other row at the average cost of a miss
+def name_cache_frame(stats):
+    stats_df = pd.DataFrame(list(stats), columns=NAME_STATS_COLUMNS)
+    stats_df = stats_df.groupby('normalizer', sort=False, as_index=False)[NAME_STATS_COLUMNS[1:]].sum()
+    misses = stats_df['misses'].where(stats_df['misses'] > 0)
+    stats_df['hit_rate'] = (stats_df['hits'] / stats_df['distinct'].where(stats_df['distinct'] > 0)).round(3)
+    stats_df['seconds_saved'] = ((stats_df['rows'] - stats_df['misses']) * stats_df['seconds'] / misses).round(6)
+    stats_df['seconds'] = stats_df['seconds'].round(6)
+    return stats_df
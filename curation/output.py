@@ -0,0 +1,187 @@
+import datetime
+import io
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .compact import expand_frame
+from .formats import EXCEL_ENGINES, OUTPUT_FORMATS
+from .timing import run_stage
+
+# Deflate level of the CSV files in a zip archive: fast, as the point of the format is write speed.
+# Parquet files are compressed column by column already and are stored as they are.
+ZIP_COMPRESS_LEVEL = 1
+
+# Formats pandas uses for header and date cells, repeated here for sheets written row by row
+HEADER_FORMAT = {'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}
+DATE_FORMAT = 'YYYY-MM-DD'
+DATETIME_FORMAT = 'YYYY-MM-DD HH:MM:SS'
+
+# xlsxwriter pads column widths by 5 pixels (7 pixels per character for Calibri 11). Widths are
+# given to it in pixels so that the stored width is the plain character width, like openpyxl's.
+PIXELS_PER_CHARACTER = 7
+
+
+# Width of every column of a sheet: the longest value as written to Excel, header included,
+# plus 2. Blank cells are written as empty strings and count as 0.
+def column_widths(df):
+    widths = []
+    for column in df.columns:
+        values = df[column].astype(object)
+        lengths = values.where(values.notna(), '').astype(str).str.len()
+        max_length = max(len(str(column)), int(lengths.max()) if len(lengths) else 0)
+        widths.append(max_length + 2)
+    return widths
+
+
+# Cell formats of a workbook written row by row
+def sheet_formats(workbook):
+    return {
+        'header': workbook.add_format(HEADER_FORMAT),
+        'date': workbook.add_format({'num_format': DATE_FORMAT}),
+        'datetime': workbook.add_format({'num_format': DATETIME_FORMAT}),
+    }
+
+
+def write_header(workbook, sheet_name, columns, formats):
+    worksheet = workbook.add_worksheet(sheet_name)
+    for col, column in enumerate(columns):
+        worksheet.write(0, col, column, formats['header'])
+    return worksheet
+
+
+# Write the rows of a DataFrame to a worksheet, starting at first_row
+def write_cells(worksheet, df, first_row, formats):
+    columns = [df[column].tolist() for column in df.columns]
+    for row, values in enumerate(zip(*columns), start=first_row):
+        for col, value in enumerate(values):
+            if pd.isna(value):
+                continue
+            if isinstance(value, np.generic):
+                value = value.item()
+            if isinstance(value, datetime.datetime):
+                worksheet.write_datetime(row, col, value, formats['datetime'])
+            elif isinstance(value, datetime.date):
+                worksheet.write_datetime(row, col, value, formats['date'])
+            else:
+                worksheet.write(row, col, value)
+
+
+# Write one sheet row by row, for xlsxwriter's constant_memory mode (which only accepts
+# rows in order, while DataFrame.to_excel writes column by column)
+def write_rows(workbook, sheet_name, df):
+    formats = sheet_formats(workbook)
+    worksheet = write_header(workbook, sheet_name, df.columns, formats)
+    write_cells(worksheet, df, 1, formats)
+    return worksheet
+
+
+# Width of every column of every sheet, by sheet name (what autofit_columns used to measure)
+def sheet_column_widths(sheets):
+    return {sheet_name: column_widths(df) for sheet_name, df in sheets.items()}
+
+
+# openpyxl is imported here rather than with the module: CSV and Parquet output never needs it
+def write_openpyxl(sheets, widths, destination):
+    from openpyxl.utils import get_column_letter
+
+    with pd.ExcelWriter(destination, engine='openpyxl') as writer:
+        for sheet_name, df in sheets.items():
+            df = expand_frame(df)
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+            worksheet = writer.sheets[sheet_name]
+            for col, width in enumerate(widths[sheet_name], start=1):
+                worksheet.column_dimensions[get_column_letter(col)].width = width
+    return destination
+
+
+def write_xlsxwriter(sheets, widths, destination, constant_memory=False):
+    # Build the workbook in memory unless rows are streamed to temporary files (constant_memory)
+    options = {'constant_memory': True} if constant_memory else {'in_memory': True}
+    with pd.ExcelWriter(destination, engine='xlsxwriter', engine_kwargs={'options': options}) as writer:
+        for sheet_name, df in sheets.items():
+            df = expand_frame(df)
+            if constant_memory:
+                worksheet = write_rows(writer.book, sheet_name, df)
+            else:
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+                worksheet = writer.sheets[sheet_name]
+            for col, width in enumerate(widths[sheet_name]):
+                worksheet.set_column_pixels(col, col, width * PIXELS_PER_CHARACTER)
+    return destination
+
+
+# Write the curated sheets to an Excel file (a path or a binary buffer such as io.BytesIO) and
+# size every column from the DataFrames. With engine='xlsxwriter', constant_memory=True streams each row to disk
+# as it is written instead of holding the whole workbook in memory. Sizing the columns and writing
+# the workbook are timed as separate stages when a timings list is given.
+def write_excel(sheets, destination, engine='xlsxwriter', constant_memory=False, timings=None):
+    if engine not in EXCEL_ENGINES:
+        raise ValueError(f"Unknown Excel engine '{engine}', expected one of {', '.join(EXCEL_ENGINES)}")
+
+    widths = run_stage(timings, 'column_widths', sheet_column_widths, sheets)
+    if engine == 'openpyxl':
+        return run_stage(timings, 'write_excel', write_openpyxl, sheets, widths, destination)
+    return run_stage(timings, 'write_excel', write_xlsxwriter, sheets, widths, destination, constant_memory)
+
+
+# Parquet columns have a single type. Mixed 'object' columns become numbers when all their values
+# are numbers or blank (''), and text otherwise, numbers written as in the CSV output.
+def columnar_frame(df):
+    df = df.copy(deep=False)
+    for column in df.columns:
+        values = df[column]
+        if values.dtype != object:
+            continue
+        blank = values.isna() | (values == '')
+        types = set(map(type, values[~blank]))
+        if types and all(issubclass(value_type, (int, float, np.integer, np.floating))
+                         and not issubclass(value_type, (bool, np.bool_)) for value_type in types):
+            df[column] = pd.to_numeric(values.mask(blank))
+        elif len(types) > 1 and str in types:
+            df[column] = values.map(str).mask(values.isna())
+    return df
+
+
+# Zip archive for the sheets, written to a path or a binary buffer: entries are deflated at ZIP_COMPRESS_LEVEL
+def open_zip(destination):
+    return zipfile.ZipFile(destination, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESS_LEVEL)
+
+
+# Zip archive entry of one sheet, for ZipFile.open: CSV files are deflated as the archive is set
+# up to (see open_zip), Parquet files stored as they are
+def zip_entry_info(sheet_name, file_format):
+    if file_format == 'csv':
+        return f'{sheet_name}.csv'
+    entry_info = zipfile.ZipInfo(f'{sheet_name}.{file_format}', date_time=time.localtime()[:6])
+    entry_info.compress_type = zipfile.ZIP_STORED
+    return entry_info
+
+
+# Write each sheet as '<sheet name>.csv' or '<sheet name>.parquet' into a zip archive (a path or
+# a binary buffer), in sheet order. Files are streamed into the archive as they are written.
+def write_zip(sheets, destination, file_format):
+    with open_zip(destination) as archive:
+        for sheet_name, df in sheets.items():
+            df = expand_frame(df)
+            with archive.open(zip_entry_info(sheet_name, file_format), 'w', force_zip64=True) as entry:
+                if file_format == 'csv':
+                    with io.TextIOWrapper(entry, encoding='utf-8', newline='') as text:
+                        df.to_csv(text, index=False)
+                else:
+                    pq.write_table(pa.Table.from_pandas(columnar_frame(df), preserve_index=False), entry)
+    return destination
+
+
+# Write the curated sheets in one of OUTPUT_FORMATS. engine and constant_memory only apply to xlsx.
+def write_output(sheets, destination, output_format='xlsx', engine='xlsxwriter', constant_memory=False,
+                 timings=None):
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {', '.join(OUTPUT_FORMATS)}")
+    if output_format == 'xlsx':
+        return write_excel(sheets, destination, engine=engine, constant_memory=constant_memory, timings=timings)
+    return run_stage(timings, 'write_zip', write_zip, sheets, destination, output_format)
@@ -0,0 +1,74 @@
+import logging
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# Numbered source columns, e.g. numbered('Tranche {} Lenders') -> 'Tranche 1 Lenders' ... 'Tranche 20 Lenders'
+def numbered(column_template, numbers=range(1, 21)):
+    return [column_template.format(i) for i in numbers]
+
+
+# Source columns read by each stage of create_destination_file. Columns a stage looks for but
+# that are missing from a source file are simply not loaded, as before.
+STAGE_COLUMNS = {
+    'process_transaction_sheet': [
+        "Transaction Upload ID", "Transaction Name", "Current status", "Type", "Transaction Currency",
+        "Transaction size (m)", "Geography", "Sector", "Sub-Sector", "PPP", "Duration",
+        "Delivery Model", "SPV", "Helper_Any Level Sectors"],
+    'process_events_sheet': [
+        "Transaction Upload ID", "Current status", "Current status date", "Financial close",
+        "Transaction Launch", "RFP returned", "Preferred Proponents", "Expressions of Interest",
+        "RFQ returned", "Shortlisted proponents"],
+    'process_bidders_any_sheet': [
+        "Transaction Upload ID", "Legal Advisors", "Technical Advisors", "Financial Advisors",
+        "Vendors", "Grantors"],
+    'process_tranches_sheet': [
+        "Transaction Upload ID", "Tranche ESG Type", "Transaction size USD(m)", "Transaction size (m)",
+        *numbered('Loan Debt Tranche {} Type'), *numbered('Tranche {} Tenor'),
+        *numbered('Tranche {} Volume USD (m)')],
+    'populate_additional_tranches': [
+        "Transaction Upload ID", "Transaction size USD(m)", "Transaction size (m)",
+        "Equity Providers at FC", "Equity at FC USD(m)",
+        *numbered('Capital Market Debt {} Volume USD (m)')],
+    'populate_tranche_roles_any': [
+        "Transaction Upload ID", "Equity Providers at FC",
+        *numbered('Tranche {} Lenders'), *numbered('Capital Market Debt {} Underwriters'),
+        *numbered('Capital Market Debt 2{} Underwriters')],
+}
+
+# Free-text columns that the stages always treat as strings (split into company lists, searched
+# for tags). These are read as strings rather than having their type inferred.
+TEXT_COLUMNS = [
+    "Sub-Sector", "Legal Advisors", "Technical Advisors", "Financial Advisors", "Vendors", "Grantors",
+    "Equity Providers at FC", *numbered('Loan Debt Tranche {} Type'), *numbered('Tranche {} Lenders'),
+    *numbered('Capital Market Debt {} Underwriters'), *numbered('Capital Market Debt 2{} Underwriters')]
+
+SOURCE_COLUMNS = frozenset(column for columns in STAGE_COLUMNS.values() for column in columns)
+
+
+# Load the first sheet of an INFRA3 export, keeping only the columns the curation stages use.
+# The workbook is opened in openpyxl's read-only, values-only mode.
+def read_source(source_file, columns=SOURCE_COLUMNS):
+    header = []
+
+    def use_column(name):
+        header.append(name)
+        return name in columns
+
+    start = time.perf_counter()
+    xls = pd.ExcelFile(source_file, engine='openpyxl', engine_kwargs={'read_only': True, 'data_only': True})
+    first_sheet_name = xls.sheet_names[0]
+    transaction_df = xls.parse(
+        first_sheet_name,
+        usecols=use_column,
+        dtype={column: str for column in TEXT_COLUMNS if column in columns})
+    xls.close()
+
+    logger.info(
+        "Read %d of %d source columns, %d rows in %.2fs (%.1f MB)",
+        transaction_df.shape[1], len(header), len(transaction_df), time.perf_counter() - start,
+        transaction_df.memory_usage(deep=True).sum() / 1e6)
+    return transaction_df
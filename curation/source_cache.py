@@ -0,0 +1,170 @@
+import datetime
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .reader import SOURCE_COLUMNS, TEXT_COLUMNS, read_source
+
+logger = logging.getLogger(__name__)
+
+# Default bound on the total size of a cache directory; the least recently used entries are
+# deleted once it is exceeded
+SOURCE_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Version of the cache file layout below
+CACHE_FORMAT = 2
+
+# Part of every cache key that changes with the way sources are parsed (the columns read, the
+# columns pinned to strings, the pandas version), so that stale entries are never used
+READER_VERSION = hashlib.sha256(json.dumps(
+    [CACHE_FORMAT, sorted(SOURCE_COLUMNS), sorted(TEXT_COLUMNS), pd.__version__]).encode()).hexdigest()[:12]
+
+# Mixed-type ('object') columns, e.g. volumes given as numbers or as text like '1,250', are stored
+# as one Arrow column per Python type plus a column of type codes, so every value comes back with
+# its original type. Code 0 is None.
+OBJECT_TYPES = {str: (1, pa.string()), int: (2, pa.int64()), float: (3, pa.float64()),
+                bool: (4, pa.bool_()), datetime.datetime: (5, pa.timestamp('us'))}
+OBJECT_TYPE_CODE_SUFFIX = '\x00type'
+
+
+# Name of the Arrow column holding the values of one type of an object column
+def typed_column_name(column, code):
+    return f'{column}\x00{code}'
+
+
+def encode_object_column(column, values):
+    codes = np.array([0 if value is None else OBJECT_TYPES.get(type(value), (-1,))[0] for value in values], dtype=np.int8)
+    if (codes < 0).any():
+        unsupported = {type(value).__name__ for value, code in zip(values, codes) if code < 0}
+        raise TypeError(f"Column '{column}' has values of unsupported types: {', '.join(sorted(unsupported))}")
+
+    arrays = {column + OBJECT_TYPE_CODE_SUFFIX: pa.array(codes)}
+    for code, arrow_type in OBJECT_TYPES.values():
+        if (codes == code).any():
+            arrays[typed_column_name(column, code)] = pa.array(
+                [value if value_code == code else None for value, value_code in zip(values, codes)], type=arrow_type)
+    return arrays
+
+
+def decode_object_column(table, column):
+    codes = table.column(column + OBJECT_TYPE_CODE_SUFFIX).to_numpy()
+    values = np.full(len(codes), None, dtype=object)
+    for code, _ in OBJECT_TYPES.values():
+        name = typed_column_name(column, code)
+        if name in table.column_names:
+            present = codes == code
+            values[present] = np.array(table.column(name).to_pylist(), dtype=object)[present]
+    return values
+
+
+# Write a parsed source to a Feather file, uncompressed so that it can be memory-mapped. Float
+# columns keep NaN as a value rather than as Arrow nulls, so that load_frame can use them as they are.
+def store_frame(transaction_df, path):
+    object_columns = [column for column in transaction_df.columns if transaction_df[column].dtype == object]
+    typed_columns = [column for column in transaction_df.columns if column not in object_columns]
+    table = pa.Table.from_pandas(transaction_df[typed_columns], preserve_index=False)
+    for position, column in enumerate(typed_columns):
+        if transaction_df[column].dtype == np.float64:
+            table = table.set_column(position, column, pa.array(transaction_df[column].to_numpy(), from_pandas=False))
+    for column in object_columns:
+        for name, array in encode_object_column(column, transaction_df[column].to_numpy()).items():
+            table = table.append_column(name, array)
+
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'curation'] = json.dumps({
+        'columns': list(transaction_df.columns), 'object_columns': object_columns}).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # Written under a temporary name first, so that other processes never see a partial file
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        feather.write_feather(table, temporary_path, compression='uncompressed')
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+# Load a parsed source from the cache, memory-mapping the file. Text and float columns are not
+# copied: they are read-only views of the mapping (Arrow-backed strings, and float arrays with one
+# block per column). Date columns are converted (their blanks are Arrow nulls), and object
+# columns are rebuilt value by value.
+def load_frame(path):
+    table = feather.read_table(path, memory_map=True)
+    layout = json.loads(table.schema.metadata[b'curation'])
+    object_columns = layout['object_columns']
+    typed_columns = [column for column in layout['columns'] if column not in object_columns]
+
+    transaction_df = table.select(typed_columns).to_pandas(split_blocks=True)
+    for column in object_columns:
+        transaction_df[column] = pd.Series(decode_object_column(table, column), dtype=object)
+    return transaction_df[layout['columns']]
+
+
+# Delete the least recently used cache entries until the directory is within max_bytes
+def evict(cache_dir, max_bytes=SOURCE_CACHE_MAX_BYTES):
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.feather'):
+            path = os.path.join(cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def read_bytes(source_file):
+    if isinstance(source_file, (bytes, bytearray, memoryview)):
+        return bytes(source_file)
+    if hasattr(source_file, 'read'):
+        return source_file.read()
+    with open(source_file, 'rb') as file:
+        return file.read()
+
+
+# read_source with a local cache of parsed sources, keyed by the SHA-256 of the file's content.
+# A source seen before is loaded from the cache without parsing the workbook at all. Sources with
+# values that can't be stored exactly are parsed as usual and not cached.
+def read_source_cached(source_file, cache_dir, max_bytes=SOURCE_CACHE_MAX_BYTES):
+    data = read_bytes(source_file)
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f'{hashlib.sha256(data).hexdigest()}-{READER_VERSION}.feather')
+
+    if os.path.exists(path):
+        start = time.perf_counter()
+        try:
+            transaction_df = load_frame(path)
+        except (OSError, KeyError, ValueError, pa.ArrowException) as e:
+            logger.warning("Ignoring unreadable source cache entry %s: %s", path, e)
+        else:
+            os.utime(path)  # Mark as recently used
+            logger.info("Loaded %d rows from the source cache in %.2fs", len(transaction_df), time.perf_counter() - start)
+            return transaction_df
+
+    transaction_df = read_source(io.BytesIO(data))
+    try:
+        store_frame(transaction_df, path)
+    except (OSError, TypeError, pa.ArrowException) as e:
+        logger.warning("Not caching the parsed source: %s", e)
+    else:
+        evict(cache_dir, max_bytes)
+    return transaction_df
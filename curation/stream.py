@@ -0,0 +1,202 @@
+import io
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+from .engine import COMPUTED_TRANCHE_COLUMNS, CURATION_STAGES, curate_transactions
+from .formats import STREAM_FORMATS
+from .graph import graph_pools, shutdown_pools
+from .output import (PIXELS_PER_CHARACTER, column_widths, open_zip, sheet_formats, write_cells, write_header,
+                     zip_entry_info)
+from .reader import SOURCE_COLUMNS, TEXT_COLUMNS
+from .timing import run_stage, sum_timings
+
+# Source rows read and curated at a time in streaming mode
+STREAM_CHUNK_ROWS = 5000
+
+
+# A cell's value as pandas' openpyxl reader gives it: '' for empty cells, NaN for errors, and
+# whole numbers as int
+def convert_cell(cell):
+    if cell.value is None:
+        return ''
+    if cell.data_type == TYPE_ERROR:
+        return float('nan')
+    if cell.data_type == TYPE_NUMERIC:
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+
+# Row values with the trailing empty cells dropped
+def row_values(row):
+    values = [convert_cell(cell) for cell in row]
+    while values and values[-1] == '':
+        values.pop()
+    return values
+
+
+# Parse a chunk of rows the way read_source parses a whole sheet (same column selection, text
+# columns and type inference). Types are inferred per chunk, so a column that mixes numbers and text
+# in the export but holds numbers only in a chunk is read as floats there rather than as objects.
+def parse_chunk(header, rows, columns):
+    width = max([len(header)] + [len(values) for values in rows])
+    data = [values + [''] * (width - len(values)) for values in [header] + rows]
+    parser = TextParser(
+        data, header=0, usecols=lambda name: name in columns, skip_blank_lines=False,
+        dtype={column: str for column in TEXT_COLUMNS if column in columns})
+    chunk_df = parser.read()
+    # A numeric column is read as integers when the chunk has no blank in it, where a normal run
+    # reads it as floats because of the blanks elsewhere in the export: numbers are floats in every chunk
+    integer_columns = [column for column in chunk_df.columns if pd.api.types.is_integer_dtype(chunk_df[column])]
+    return chunk_df.astype(dict.fromkeys(integer_columns, float))
+
+
+# Read the first sheet of a source workbook as DataFrames of up to chunk_rows rows, row by row
+# in openpyxl's read-only mode. Blank rows are kept (as read_source keeps them) unless they end
+# the sheet. There is always at least one chunk, possibly without rows.
+def iter_source_chunks(source_file, chunk_rows=STREAM_CHUNK_ROWS, columns=SOURCE_COLUMNS):
+    workbook = load_workbook(source_file, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[0]
+        worksheet.reset_dimensions()
+        rows = worksheet.iter_rows()
+        header = row_values(next(rows, ()))
+
+        chunk = []
+        blank_rows = 0
+        yielded = False
+        for row in rows:
+            values = row_values(row)
+            if not values:
+                blank_rows += 1
+                continue
+            chunk.extend([] for _ in range(blank_rows))
+            blank_rows = 0
+            chunk.append(values)
+            if len(chunk) >= chunk_rows:
+                yield parse_chunk(header, chunk, columns)
+                chunk = []
+                yielded = True
+        if chunk or not yielded:
+            yield parse_chunk(header, chunk, columns)
+    finally:
+        workbook.close()
+
+
+# Drop the Events rows already curated from earlier chunks, as drop_duplicates does over a whole
+# source. Rows are remembered by a 64-bit hash of their values, not the rows themselves.
+def drop_seen_events(events_df, seen):
+    hashes = pd.util.hash_pandas_object(events_df, index=False).to_numpy()
+    new = ~pd.Series(hashes).isin(seen).to_numpy()
+    seen.update(hashes[new].tolist())
+    return events_df[new]
+
+
+# The computed columns of a chunk's 'Tranches' sheet with their integers as floats. These columns
+# hold integers only when no row of the whole export was computed (see computed_column), which a
+# chunk can't tell; the other values are floats, or '' for the additional tranches.
+def float_computed_columns(tranches_df):
+    tranches_df = tranches_df.copy()
+    for column in COMPUTED_TRANCHE_COLUMNS:
+        tranches_df[column] = tranches_df[column].map(
+            lambda value: float(value) if isinstance(value, (int, np.integer)) and not isinstance(value, bool) else value)
+    return tranches_df
+
+
+# Curate a source chunk by chunk: yields the curated sheets of each chunk. With workers > 1, the
+# stage pools are created once for the source, not for every chunk.
+def curate_chunks(source_file, chunk_rows=STREAM_CHUNK_ROWS, timings=None, workers=1):
+    seen_events = set()
+    chunks = iter_source_chunks(source_file, chunk_rows)
+    pools = graph_pools(CURATION_STAGES, workers) if workers > 1 else None
+    try:
+        while True:
+            transaction_df = run_stage(timings, 'read_source', next, chunks, None)
+            if transaction_df is None:
+                return
+            sheets = curate_transactions(transaction_df, timings, workers, pools=pools)
+            sheets['Events'] = run_stage(timings, 'drop_seen_events', drop_seen_events, sheets['Events'], seen_events)
+            sheets['Tranches'] = float_computed_columns(sheets['Tranches'])
+            yield sheets
+    finally:
+        if pools is not None:
+            shutdown_pools(pools)
+
+
+# Append the sheets of every chunk to a workbook written by xlsxwriter in constant_memory mode, so
+# only the current row of each sheet is held in memory. Column widths are the widest over all
+# chunks, set once every row is written.
+def stream_xlsx(sheet_chunks, destination, timings=None):
+    workbook = xlsxwriter.Workbook(destination, {'constant_memory': True})
+    formats = sheet_formats(workbook)
+    worksheets, next_rows, widths = {}, {}, {}
+    for sheets in sheet_chunks:
+        for sheet_name, df in sheets.items():
+            if sheet_name not in worksheets:
+                worksheets[sheet_name] = write_header(workbook, sheet_name, df.columns, formats)
+                next_rows[sheet_name] = 1
+                widths[sheet_name] = column_widths(df.iloc[:0])
+            run_stage(timings, 'write_excel', write_cells, worksheets[sheet_name], df, next_rows[sheet_name], formats,
+                      rows_in=len(df))
+            next_rows[sheet_name] += len(df)
+            widths[sheet_name] = [max(width, chunk_width) for width, chunk_width in zip(widths[sheet_name], column_widths(df))]
+
+    for sheet_name, worksheet in worksheets.items():
+        for col, width in enumerate(widths[sheet_name]):
+            worksheet.set_column_pixels(col, col, width * PIXELS_PER_CHARACTER)
+    run_stage(timings, 'write_excel', workbook.close)
+    return destination
+
+
+def append_csv(df, path, header):
+    with open(path, 'a', encoding='utf-8', newline='') as file:
+        df.to_csv(file, index=False, header=header)
+
+
+# Append the sheets of every chunk to one temporary CSV file per sheet, then put the files into a
+# zip archive in sheet order (zip entries can't be written to in turns)
+def stream_csv(sheet_chunks, destination, timings=None):
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = {}
+        for sheets in sheet_chunks:
+            for sheet_name, df in sheets.items():
+                header = sheet_name not in paths
+                paths.setdefault(sheet_name, os.path.join(workdir, f'{len(paths)}.csv'))
+                run_stage(timings, 'write_zip', append_csv, df, paths[sheet_name], header, rows_in=len(df))
+
+        with open_zip(destination) as archive:
+            for sheet_name, path in paths.items():
+                with open(path, 'rb') as file, archive.open(zip_entry_info(sheet_name, 'csv'), 'w', force_zip64=True) as entry:
+                    shutil.copyfileobj(file, entry)
+    return destination
+
+
+# Curate a source chunk_rows rows at a time and append each chunk's rows to the output, so that
+# memory is bounded by the chunk size rather than the source size. The output has the rows of a
+# full curation (Events duplicates are dropped across chunks), but in chunk order: the rows of
+# each chunk come together, ordered within the chunk as a full curation orders them. Stage
+# timings are added up over the chunks.
+def stream_destination(source_file, destination, output_format='xlsx', chunk_rows=STREAM_CHUNK_ROWS, timings=None,
+                       workers=1):
+    if output_format not in STREAM_FORMATS:
+        raise ValueError(f"Streaming mode writes {' or '.join(STREAM_FORMATS)}, not '{output_format}'")
+    if isinstance(source_file, (bytes, bytearray, memoryview)):
+        source_file = io.BytesIO(source_file)
+
+    chunk_timings = [] if timings is not None else None
+    sheet_chunks = curate_chunks(source_file, chunk_rows, chunk_timings, workers)
+    if output_format == 'xlsx':
+        stream_xlsx(sheet_chunks, destination, chunk_timings)
+    else:
+        stream_csv(sheet_chunks, destination, chunk_timings)
+    if timings is not None:
+        timings.extend(sum_timings(chunk_timings))
+    return destination
@@ -0,0 +1,77 @@
+import json
+import logging
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columns of a stage timing record, in display order
+TIMING_COLUMNS = ['stage', 'seconds', 'rows_in', 'rows_out', 'rows_per_second']
+
+
+# Number of rows in a stage's input or output: a DataFrame, or a dict of sheets (all rows)
+def count_rows(value):
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, dict) and value and all(isinstance(df, pd.DataFrame) for df in value.values()):
+        return sum(len(df) for df in value.values())
+    return None
+
+
+# Run one stage of the curation, func(*args). With a timings list, append the stage's wall time,
+# input and output row counts and throughput to it; with timings=None (the default everywhere)
+# the stage is simply called. rows_in defaults to the rows of the first DataFrame argument.
+def run_stage(timings, stage, func, *args, rows_in=None):
+    if timings is None:
+        return func(*args)
+
+    if rows_in is None:
+        rows_in = next((rows for rows in map(count_rows, args) if rows is not None), None)
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+
+    rows_out = count_rows(result)
+    rows = rows_in if rows_in is not None else rows_out
+    timings.append({
+        'stage': stage,
+        'seconds': round(seconds, 6),
+        'rows_in': rows_in,
+        'rows_out': rows_out,
+        'rows_per_second': round(rows / seconds, 1) if rows is not None and seconds > 0 else None,
+    })
+    return result
+
+
+# Emit each stage timing as one JSON log line on the 'curation.timing' logger, together with
+# context such as the source file name
+def log_timings(timings, **context):
+    for record in timings:
+        logger.info(json.dumps({'event': 'curation_stage', **context, **record}, default=str))
+
+
+# Stage timings as a table, with a final row for the whole run
+def timings_frame(timings):
+    timings_df = pd.DataFrame(list(timings), columns=TIMING_COLUMNS)
+    total = pd.DataFrame([{'stage': 'total', 'seconds': timings_df['seconds'].sum()}], columns=TIMING_COLUMNS)
+    if len(timings_df):
+        timings_df = pd.concat([timings_df, total], ignore_index=True)
+    return timings_df.astype({'rows_in': 'Int64', 'rows_out': 'Int64'})
+
+
+# Add up the records of each stage (e.g. one per chunk of a streamed source), in the order the
+# stages first appear
+def sum_timings(timings):
+    totals = {}
+    for record in timings:
+        total = totals.setdefault(record['stage'], {'stage': record['stage'], 'seconds': 0.0, 'rows_in': None, 'rows_out': None})
+        total['seconds'] += record['seconds']
+        for key in ('rows_in', 'rows_out'):
+            if record[key] is not None:
+                total[key] = (total[key] or 0) + record[key]
+    for total in totals.values():
+        rows = total['rows_in'] if total['rows_in'] is not None else total['rows_out']
+        total['seconds'] = round(total['seconds'], 6)
+        total['rows_per_second'] = round(rows / total['seconds'], 1) if rows is not None and total['seconds'] > 0 else None
+    return list(totals.values())